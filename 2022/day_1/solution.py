@@ -1,4 +1,19 @@
+import heapq
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# NumPy is optional, it is only used to total chunks in parallel_top_elves
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
 input_path = 'input.txt'
 # Convert to absolute path
 input_path = os.path.join(os.path.dirname(__file__), input_path)
@@ -24,31 +39,138 @@ class Elf:
     def __str__(self):
         return f'Elf {self.number} has {self.total_food()} food with {self.total_calories()} calories'
 
-elves = []
-# Read file line-by-line
-# Empty line is a new elf
-with open(input_path, 'r') as f:
-    elf_sequence = 1
-    elf = Elf(elf_sequence)
-    for line in f:
-        if line == '' or line == '\n':
-            elves.append(elf)
-            elf_sequence += 1
+def parse(input_path):
+    elves = []
+    # Each run of lines between blank lines is an elf
+    with open_input(input_path) as f:
+        for elf_sequence, record in enumerate(f.records(), 1):
             elf = Elf(elf_sequence)
-        else:
-            food = Food(int(line))
-            elf.add_food(food)
-    # Add last elf
-    elves.append(elf)
-
-# Find elf with most calories
-max_elf = max(elves, key=lambda elf: elf.total_calories())
-
-print("Elf with most calories:")
-print(max_elf)
-
-# Get the top 3 elves with most calories
-top_elves = sorted(elves, key=lambda elf: elf.total_calories(), reverse=True)[:3]
-# Get the sum of calories from top_elves
-total_calories = sum([elf.total_calories() for elf in top_elves])
-print(f'Total calories from top 3 elves: {total_calories}')
\ No newline at end of file
+            for line in record:
+                elf.add_food(Food(int(bytes(line))))
+            elves.append(elf)
+    return elves
+
+
+class ElfTotal(NamedTuple):
+    number: int
+    calories: int
+
+
+def top_totals(totals: Iterable[int], k: int) -> Tuple[int, List[ElfTotal]]:
+    """
+    Number of totals, and the k largest as elves numbered from 1, most first.
+    Keeps a heap of the best k, so memory doesn't grow with the totals.
+    """
+    # Min-heap of (calories, -number), so the weakest elf is evicted first,
+    # and on ties the later elf, like a stable sort would
+    heap = []
+    number = 0
+    for number, calories in enumerate(totals, 1):
+        entry = (calories, -number)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return number, [ElfTotal(-number, calories) for calories, number in sorted(heap, reverse=True)]
+
+
+def record_totals(records: Iterable[List[memoryview]]) -> Iterator[int]:
+    for record in records:
+        yield sum(int(bytes(line)) for line in record)
+
+
+def stream_top_elves(input_path, k=3) -> List[ElfTotal]:
+    """
+    The k elves carrying the most calories, most first, in one pass over the
+    file. Only a running total for the current elf and a heap of the best k
+    are kept, so memory doesn't grow with the number of elves.
+    """
+    with open_input(input_path) as f:
+        _, top = top_totals(record_totals(f.records()), k)
+    return top
+
+
+def numpy_top_totals(data: bytes, k: int) -> Tuple[int, List[ElfTotal]]:
+    """top_totals for the records in some bytes, totalled with NumPy"""
+    # Stripped so '\r\n' line endings and whitespace only lines read as blank
+    lines = np.char.strip(np.array(data.split(b'\n')))
+    blank = lines == b''
+    values = lines[~blank].astype(np.int64)
+    # A value starts a record if it is first or follows a blank line
+    starts = np.flatnonzero(np.concatenate(([True], blank[:-1]))[~blank])
+    totals = np.add.reduceat(values, starts) if values.size else values
+    # Most calories first, then the earliest elf
+    order = np.lexsort((np.arange(totals.size), -totals))[:k]
+    return int(totals.size), [ElfTotal(int(i) + 1, int(totals[i])) for i in order]
+
+
+def _top_elves_chunk(input_path, start: int, end: int, k: int) -> Tuple[int, List[ElfTotal]]:
+    with open_input(input_path) as f:
+        if np is not None:
+            return numpy_top_totals(f.view[start:end].tobytes(), k)
+        return top_totals(record_totals(f.records(start, end)), k)
+
+
+def parallel_top_elves(input_path, k=3, workers: Optional[int] = None, chunk_size: int = 1 << 24) -> List[ElfTotal]:
+    """
+    Same as stream_top_elves, but the file is split at blank lines into
+    byte ranges that worker processes total themselves, with NumPy if it is
+    installed. Each range's top k are renumbered by the elves in earlier
+    ranges and merged into the overall top k.
+    """
+    with open_input(input_path) as f:
+        starts, ends = zip(*f.record_chunks(chunk_size))
+    paths = [input_path] * len(starts)
+    ks = [k] * len(starts)
+
+    def merge(results: Iterable[Tuple[int, List[ElfTotal]]]) -> List[ElfTotal]:
+        top = []
+        offset = 0
+        for count, chunk_top in results:
+            top.extend(ElfTotal(offset + elf.number, elf.calories) for elf in chunk_top)
+            top = heapq.nlargest(k, top, key=lambda elf: (elf.calories, -elf.number))
+            offset += count
+        return top
+
+    if workers == 1:
+        return merge(map(_top_elves_chunk, paths, starts, ends, ks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge(executor.map(_top_elves_chunk, paths, starts, ends, ks))
+
+
+def solve_streaming(input_path) -> Tuple[int, int]:
+    """Both parts without building the elves"""
+    top = stream_top_elves(input_path, 3)
+    return top[0].calories, sum(elf.calories for elf in top)
+
+
+def solve_parallel(input_path, workers: Optional[int] = None, chunk_size: int = 1 << 24) -> Tuple[int, int]:
+    """Both parts from chunks totalled across worker processes"""
+    top = parallel_top_elves(input_path, 3, workers, chunk_size)
+    return top[0].calories, sum(elf.calories for elf in top)
+
+
+def max_elf(elves):
+    # Find elf with most calories
+    return max(elves, key=lambda elf: elf.total_calories())
+
+
+def top_elves(elves, n=3):
+    # Get the top n elves with most calories
+    return heapq.nlargest(n, elves, key=lambda elf: elf.total_calories())
+
+
+def part_1(elves):
+    return max_elf(elves).total_calories()
+
+
+def part_2(elves):
+    # Get the sum of calories from top 3 elves
+    return sum([elf.total_calories() for elf in top_elves(elves)])
+
+
+if __name__ == '__main__':
+    elves = parse(input_path)
+    print("Elf with most calories:")
+    print(max_elf(elves))
+    print(f'Total calories from top 3 elves: {part_2(elves)}')
@@ -1,7 +1,95 @@
 import re
 import os
-from typing import List, Callable
+import math
+import sys
+from collections import Counter
+from typing import Dict, Iterable, List, Callable, Optional, Tuple
 import copy
+from concurrent.futures import ProcessPoolExecutor
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
+# NumPy is optional, it is only needed for Operation.apply_batch
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Opcodes for compiled operations
+ADD = 'add'
+MUL = 'mul'
+SQUARE = 'square'
+
+
+class Operation:
+    """
+    A compiled 'old <operator> <operand>' operation, parsed without eval.
+    Called with a worry level like the lambda it replaces. If a modulo is
+    set, worry levels are reduced before and after the operation so they
+    stay below the modulo.
+    """
+    def __init__(self, opcode: str, operand: int = 0, modulo: Optional[int] = None):
+        if opcode not in (ADD, MUL, SQUARE):
+            raise ValueError(f"Unknown opcode: {opcode}")
+        self.opcode = opcode
+        # Reduced too, so an operand from the input can't overflow batches
+        self.operand = operand % modulo if modulo is not None else operand
+        self.modulo = modulo
+
+    @staticmethod
+    def parse(expression: str) -> 'Operation':
+        tokens = expression.split()
+        if len(tokens) != 3 or tokens[1] not in ('+', '*'):
+            raise ValueError(f"Unsupported operation: {expression}")
+        left, operator, right = tokens
+        # Both operators are commutative, so allow the operand on either side
+        if left != 'old':
+            left, right = right, left
+        if left == 'old':
+            if right == 'old':
+                # old + old is the same as old * 2
+                return Operation(SQUARE) if operator == '*' else Operation(MUL, 2)
+            if right.isdigit():
+                return Operation(ADD if operator == '+' else MUL, int(right))
+        raise ValueError(f"Unsupported operation: {expression}")
+
+    def with_modulo(self, modulo: int) -> 'Operation':
+        """Copy of this operation that reduces worry levels modulo the given value"""
+        return Operation(self.opcode, self.operand, modulo)
+
+    def __call__(self, old):
+        # Only uses arithmetic operators, so works on scalars and arrays alike
+        if self.modulo is not None:
+            old = old % self.modulo
+        if self.opcode == ADD:
+            new = old + self.operand
+        elif self.opcode == MUL:
+            new = old * self.operand
+        else:
+            new = old * old
+        if self.modulo is not None:
+            new = new % self.modulo
+        return new
+
+    def apply_batch(self, worry_levels):
+        """
+        Applies the operation to many worry levels at once as a NumPy array.
+        The array is int64, so a modulo is required to avoid overflow and must
+        be small enough for a reduced worry level to be squared.
+        """
+        if np is None:
+            raise ImportError("NumPy is required for batched operations")
+        if self.modulo is None or self.modulo > 3037000499:
+            raise ValueError("Batched operations need a modulo below sqrt(2 ** 63)")
+        return self(np.asarray(worry_levels, dtype=np.int64))
+
+    def __repr__(self):
+        operand = 'old' if self.opcode == SQUARE else self.operand
+        operator = '+' if self.opcode == ADD else '*'
+        return f"old {operator} {operand}"
+
 
 class Item:
     def __init__(self, worry_level: int):
@@ -50,57 +138,177 @@ class Monkey:
     def from_match(match):
         monkey_id = int(match.group(1))
         items = [Item(int(item)) for item in match.group(2).split(', ')]
-        # Parse the operation into a lambda function
-        operation = eval(f"lambda old: {match.group(3)}")
+        operation = Operation.parse(match.group(3))
         monkey = Monkey(monkey_id, items, operation, int(match.group(4)), int(match.group(5)), int(match.group(6)))
         return monkey
 
 
-def calculate_monkey_business(monkeys):
-    # Get the top 2 monkeys by inspection count
-    top_monkeys = sorted(monkeys.values(), key=lambda monkey: monkey.inspection_count, reverse=True)[:2]
+class CycleSimulator:
+    """
+    Counts inspections when worry levels are reduced modulo the product of
+    the tests (part 2), without simulating every round.
+
+    Each item moves independently, so its journey is fully described by the
+    (monkey, worry level) state it starts each round in. There are finitely
+    many states, so the sequence of states must repeat. Once it does, the
+    inspections for the remaining rounds are extrapolated from the cycle.
+    """
+    def __init__(self, monkeys: Dict[int, Monkey]):
+        self.monkeys = monkeys
+        self.modulo = math.lcm(*(monkey.test for monkey in monkeys.values()))
+        # Reduction is pushed into the operations, so worry levels stay small
+        self.operations = {monkey_id: monkey.operation.with_modulo(self.modulo) for monkey_id, monkey in monkeys.items()}
+        # Monkeys take their turns in input order
+        self.order = {monkey_id: i for i, monkey_id in enumerate(monkeys)}
+        # Items starting in the same state follow the same journey
+        self._cache = {}
+
+    def step_round(self, monkey_id: int, worry_level: int) -> Tuple[Tuple[int, ...], int, int]:
+        """
+        Follows an item through one round from the given state.
+        Returns the monkeys that inspected it and the state it ends in.
+        """
+        inspected_by = []
+        while True:
+            monkey = self.monkeys[monkey_id]
+            inspected_by.append(monkey_id)
+            worry_level = self.operations[monkey_id](worry_level)
+            throw_to = monkey.throw_true if worry_level % monkey.test == 0 else monkey.throw_false
+            # Monkeys later in the order take their turn this round
+            if self.order[throw_to] <= self.order[monkey_id]:
+                return tuple(inspected_by), throw_to, worry_level
+            monkey_id = throw_to
+
+    def item_inspections(self, monkey_id: int, worry_level: int, rounds: int) -> Counter:
+        """Inspections of a single item over a number of rounds, by monkey"""
+        state = (monkey_id, worry_level % self.modulo)
+        key = (state, rounds)
+        if key in self._cache:
+            return self._cache[key]
+        # Round each state was first seen in
+        seen = {}
+        # Monkeys that inspected the item in each round
+        history = []
+        while len(history) < rounds and state not in seen:
+            seen[state] = len(history)
+            inspected_by, *state = self.step_round(*state)
+            state = tuple(state)
+            history.append(inspected_by)
+        counts = Counter()
+        if len(history) == rounds:
+            for inspected_by in history:
+                counts.update(inspected_by)
+        else:
+            cycle_start = seen[state]
+            cycle = history[cycle_start:]
+            cycles, remainder = divmod(rounds - cycle_start, len(cycle))
+            for inspected_by in history[:cycle_start] + cycle[:remainder]:
+                counts.update(inspected_by)
+            for inspected_by in cycle:
+                for inspector in inspected_by:
+                    counts[inspector] += cycles
+        self._cache[key] = counts
+        return counts
+
+    def starting_items(self) -> List[Tuple[int, int]]:
+        """(monkey, worry level) of every item before the first round"""
+        return [(monkey.id, item.worry_level) for monkey in self.monkeys.values() for item in monkey.items]
+
+    def count_items(self, items: Iterable[Tuple[int, int]], rounds: int) -> Dict[int, int]:
+        """Inspection counts by monkey for the given (monkey, worry level) items"""
+        counts = {monkey_id: 0 for monkey_id in self.monkeys}
+        for monkey_id, worry_level in items:
+            for inspector, count in self.item_inspections(monkey_id, worry_level, rounds).items():
+                counts[inspector] += count
+        return counts
+
+    def run(self, rounds: int) -> Dict[int, int]:
+        """Inspection counts by monkey after a number of rounds"""
+        return self.count_items(self.starting_items(), rounds)
+
+    def run_parallel(self, rounds: int, workers: Optional[int] = None, chunk_size: int = 1000) -> Dict[int, int]:
+        """
+        Same as run, but splits the items into chunks that are counted in
+        worker processes. Each worker builds its own simulator, and the
+        counts from each chunk are summed.
+        """
+        items = self.starting_items()
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        counts = {monkey_id: 0 for monkey_id in self.monkeys}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.monkeys,)) as executor:
+            for chunk_counts in executor.map(_count_chunk, chunks, [rounds] * len(chunks)):
+                for inspector, count in chunk_counts.items():
+                    counts[inspector] += count
+        return counts
+
+
+# Simulator for each worker process used by CycleSimulator.run_parallel
+_worker_simulator = None
+
+
+def _init_worker(monkeys: Dict[int, Monkey]):
+    global _worker_simulator
+    _worker_simulator = CycleSimulator(monkeys)
+
+
+def _count_chunk(items: List[Tuple[int, int]], rounds: int) -> Dict[int, int]:
+    return _worker_simulator.count_items(items, rounds)
+
+
+def monkey_business(inspection_counts: Iterable[int]) -> int:
     # Multiply the inspection counts of the top 2 monkeys
-    return top_monkeys[0].inspection_count * top_monkeys[1].inspection_count
+    top_counts = sorted(inspection_counts, reverse=True)[:2]
+    return top_counts[0] * top_counts[1]
 
 
-# Create dictionary of monkeys with ID as key
-monkeys = {}
+def calculate_monkey_business(monkeys):
+    return monkey_business(monkey.inspection_count for monkey in monkeys.values())
+
 
 # Read input file
 input_path = os.path.join(os.path.dirname(__file__), 'input.txt')
 
 monkey_pattern = re.compile(r'Monkey (\d+):\n\s+Starting items: ([\d, ]+)\n\s+Operation: new = (.*)\n\s+Test: divisible by (\d+)\n\s+If true: throw to monkey (\d+)\n\s+If false: throw to monkey (\d+)')
 
-with open(input_path, 'r') as input_file:
-    # Find all monkey_pattern matches in input file
-    monkeys = {monkey.id: monkey for monkey in (Monkey.from_match(match) for match in monkey_pattern.finditer(input_file.read()))}
-
-# Copy initial monkey state
-monkeys_part_1 = copy.deepcopy(monkeys)
-monkeys_part_2 = copy.deepcopy(monkeys)
-
-rounds = 20
-for round in range(rounds):
-    # Process each monkey
-    for monkey in monkeys_part_1.values():
-        monkey.process_round(monkeys_part_1)
-
-part_1_answer = calculate_monkey_business(monkeys_part_1)
-
-# Part 2
-rounds = 10000
-for round in range(rounds):
-    # Use modular arithmetic trick (from Reddit)
-    # Get common denominator of all test values
-    common_denominator = 1
-    for monkey in monkeys_part_2.values():
-        common_denominator *= monkey.test
-    
-    # Process each monkey
-    for monkey in monkeys_part_2.values():
-        monkey.process_round(monkeys_part_2, modulo=common_denominator)
-
-part_2_answer = calculate_monkey_business(monkeys_part_2)
-
-print(f"Part 1: {part_1_answer}")
-print(f"Part 2: {part_2_answer}")
\ No newline at end of file
+
+def parse(input_path):
+    # Create dictionary of monkeys with ID as key
+    # Each monkey is a record of lines separated by blank lines
+    monkeys = {}
+    with open_input(input_path) as input_file:
+        for record in input_file.records():
+            match = monkey_pattern.match('\n'.join(str(line, 'ascii') for line in record))
+            if match is None:
+                raise ValueError(f"Unrecognised monkey: {str(record[0], 'ascii')}")
+            monkey = Monkey.from_match(match)
+            monkeys[monkey.id] = monkey
+    return monkeys
+
+
+def part_1(monkeys):
+    # Copy initial monkey state
+    monkeys_part_1 = copy.deepcopy(monkeys)
+    rounds = 20
+    for round in range(rounds):
+        # Process each monkey
+        for monkey in monkeys_part_1.values():
+            monkey.process_round(monkeys_part_1)
+    return calculate_monkey_business(monkeys_part_1)
+
+
+def part_2(monkeys, rounds=10000, workers=1, chunk_size=1000):
+    # Use modular arithmetic trick (from Reddit), so the worry level
+    # state of each item is finite and its journey eventually cycles
+    simulator = CycleSimulator(monkeys)
+    # Items are independent, so with many items they can be split across processes
+    if workers == 1:
+        counts = simulator.run(rounds)
+    else:
+        counts = simulator.run_parallel(rounds, workers, chunk_size)
+    return monkey_business(counts.values())
+
+
+if __name__ == '__main__':
+    monkeys = parse(input_path)
+    print(f"Part 1: {part_1(monkeys)}")
+    print(f"Part 2: {part_2(monkeys)}")
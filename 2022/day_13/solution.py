@@ -1,49 +1,236 @@
-from typing import List, Union, Optional
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Union, Optional, Tuple
 import os
+import re
+import sys
 from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
+# Packets are stored as a flat array of tokens. Integers are stored as
+# themselves (they are never negative), and lists as OPEN ... CLOSE markers,
+# so [1,[2,3]] is OPEN 1 OPEN 2 3 CLOSE CLOSE.
+OPEN = -1
+CLOSE = -2
+
+token_pattern = re.compile(r'\d+|\S')
+
+
+def tokenize_packet(s: str) -> array:
+    """
+    Tokenizes a packet such as '[1,[2,3]]' without eval, and without recursion.
+    Raises ValueError unless the packet is a single list whose elements are
+    separated by exactly one comma, and whose integers fit in 64 bits.
+    """
+    tokens = array('q')
+    depth = 0
+    # Whether the last token finished an element (an int or a ']'),
+    # so a ',' or ']' may follow, rather than a new element
+    after_element = False
+    after_comma = False
+    for match in token_pattern.finditer(s):
+        token = match.group()
+        if depth == 0 and tokens:
+            raise ValueError(f"Unexpected {token!r} after the end of packet: {s.strip()}")
+        if token == ',':
+            if not after_element:
+                raise ValueError(f"Unexpected ',' in packet: {s.strip()}")
+            after_element = False
+            after_comma = True
+            continue
+        if token == ']':
+            if depth == 0 or after_comma:
+                raise ValueError(f"Unexpected ']' in packet: {s.strip()}")
+            tokens.append(CLOSE)
+            depth -= 1
+        elif after_element:
+            raise ValueError(f"Missing ',' before {token!r} in packet: {s.strip()}")
+        elif token == '[':
+            tokens.append(OPEN)
+            depth += 1
+        elif token.isdigit():
+            if depth == 0:
+                raise ValueError(f"Packet must be a list: {s.strip()}")
+            try:
+                tokens.append(int(token))
+            except OverflowError:
+                raise ValueError(f"Integer {token} doesn't fit in 64 bits in packet: {s.strip()}") from None
+        else:
+            raise ValueError(f"Unexpected {token!r} in packet: {s.strip()}")
+        after_element = token != '['
+        after_comma = False
+    if not tokens or depth != 0:
+        raise ValueError(f"Unbalanced '[' in packet: {s.strip()}")
+    return tokens
+
+
+def compare_tokens(left: array, right: array) -> Optional[bool]:
+    """
+    Compares two token arrays like the puzzle compares packets. True if left
+    comes first, False if right does, None if they are equal. When an int
+    meets a list, the int is treated as a list holding only that int, by
+    pushing it back followed by a CLOSE onto that side's stack of tokens.
+    """
+    i = j = 0
+    left_pending = []
+    right_pending = []
+    while True:
+        if left_pending:
+            a = left_pending.pop()
+        elif i < len(left):
+            a = left[i]
+            i += 1
+        else:
+            a = None
+        if right_pending:
+            b = right_pending.pop()
+        elif j < len(right):
+            b = right[j]
+            j += 1
+        else:
+            b = None
+
+        if a is None or b is None:
+            if a is None and b is None:
+                return None
+            return a is None
+        if a >= 0 and b >= 0:
+            if a != b:
+                return a < b
+        elif a == b:
+            # Both lists start or both lists end
+            continue
+        elif a == CLOSE:
+            # Left list ran out first
+            return True
+        elif b == CLOSE:
+            return False
+        elif a == OPEN:
+            # Right int against left list
+            right_pending.append(CLOSE)
+            right_pending.append(b)
+        else:
+            # Left int against right list
+            left_pending.append(CLOSE)
+            left_pending.append(a)
+
+
+# Stands in for the height ints are lifted to in sort keys, above any real depth
+TOP = sys.maxsize
+
+
+def sort_key(tokens: array) -> tuple:
+    """
+    Order-preserving key for a token array, so packets sort with plain tuple
+    comparisons. An int compares like a list holding only that int, so every
+    int can be wrapped in lists until all ints sit at the same depth, deeper
+    than any real list, without changing the order. Then an int only ever
+    meets an int, and packets compare like their token strings with
+    CLOSE < OPEN < ints.
+
+    Between two ints, that string is a run of CLOSEs down from the int depth,
+    some OPEN/CLOSE runs, then a run of OPENs back up. The key records the
+    depth each run ends at: a lower CLOSE run or a higher OPEN run wins the
+    string comparison at the same point. The run back up to the ints is
+    recorded as TOP, so the wrapping depth itself never needs to be chosen.
+    """
+    key = []
+    depth = 0
+    # Direction of the current run of markers, None straight after an int
+    going_up = True
+    for token in tokens:
+        if token == OPEN:
+            if not going_up:
+                key.append(depth)
+            going_up = True
+            depth += 1
+        elif token == CLOSE:
+            if going_up:
+                key.append(depth)
+            going_up = False
+            depth -= 1
+        else:
+            if not going_up:
+                key.append(depth)
+            key.append(TOP)
+            key.append(token)
+            going_up = None
+    key.append(depth)
+    return tuple(key)
+
 
 class Packet:
-    def __init__(self, contents: List[Union[List, int]]):
-        self.contents = contents
+    def __init__(self, tokens: array):
+        self.tokens = tokens
+        # Built on first use by the sort_key property
+        self._sort_key = None
+
+    @staticmethod
+    def from_contents(contents: List[Union[List, int]]) -> 'Packet':
+        return Packet(encode_items(contents))
+
+    @property
+    def contents(self) -> List[Union[List, int]]:
+        # Rebuild the nested lists, with an explicit stack of open lists
+        stack = [[]]
+        for token in self.tokens:
+            if token == OPEN:
+                items = []
+                stack[-1].append(items)
+                stack.append(items)
+            elif token == CLOSE:
+                stack.pop()
+            else:
+                stack[-1].append(token)
+        return stack[0][0]
+
+    @property
+    def sort_key(self) -> tuple:
+        if self._sort_key is None:
+            self._sort_key = sort_key(self.tokens)
+        return self._sort_key
 
-    # Compare with other packet using compare_items
+    # Compare with other packet using the cached sort keys,
+    # so sorting many packets only walks each packet once
     def __lt__(self, other: 'Packet') -> bool:
-        return Packet.compare_items(self.contents, other.contents) == True
+        return self.sort_key < other.sort_key
 
     def __gt__(self, other: 'Packet') -> bool:
-        return Packet.compare_items(self.contents, other.contents) == False
+        return self.sort_key > other.sort_key
 
     def __eq__(self, other: 'Packet') -> bool:
-        return Packet.compare_items(self.contents, other.contents) == None
+        return self.sort_key == other.sort_key
 
     def __repr__(self) -> str:
         return str(self.contents)
 
     @staticmethod
     def compare_items(left: Union[List, int], right: Union[List, int]) -> Optional[bool]:
-        if isinstance(left, int) and isinstance(right, int):
-            if left == right:
-                return None
-            return left < right
-        if isinstance(left, list) and isinstance(right, list):
-            i = 0
-            while True:
-                if i >= len(left) and i < len(right):
-                    return True
-                if i < len(left) and i >= len(right):
-                    return False
-                if i >= len(left) and i >= len(right):
-                    return None
-                left_item = left[i]
-                right_item = right[i]
-                result = Packet.compare_items(left_item, right_item)
-                if result is not None:
-                    return result
-                i += 1
-        if isinstance(left, int) and isinstance(right, list):
-            return Packet.compare_items([left], right)
-        if isinstance(left, list) and isinstance(right, int):
-            return Packet.compare_items(left, [right])
+        return compare_tokens(encode_items(left), encode_items(right))
+
+
+def encode_items(items: Union[List, int]) -> array:
+    """Token array for nested lists (or a bare int)"""
+    tokens = array('q')
+    # Iterators of the lists being encoded, innermost last
+    stack = [iter([items])]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, list):
+                tokens.append(OPEN)
+                stack.append(iter(item))
+                break
+            tokens.append(item)
+        else:
+            stack.pop()
+            if stack:
+                tokens.append(CLOSE)
+    return tokens
+
 
 class PacketPair:
     def __init__(self, packet_1: Packet, packet_2: Packet):
@@ -51,63 +238,133 @@ class PacketPair:
         self.packet_2 = packet_2
 
     def check_packet_order(self) -> bool:
-        return Packet.compare_items(self.packet_1.contents, self.packet_2.contents)
-
+        return compare_tokens(self.packet_1.tokens, self.packet_2.tokens)
 
 
 def parse_packet(s: str) -> Packet:
-    # This is bad but otherwise need to write a full parser
-    return Packet(eval(s))
+    return Packet(tokenize_packet(s))
+
+
+def read_packets(lines: Iterable[str]) -> Iterator[Packet]:
+    """Parses packets one line at a time, skipping the blank lines between pairs"""
+    for line in lines:
+        if line.strip():
+            yield parse_packet(line)
+
+
+def rank_of(packets: Iterable[Packet], probe: Packet) -> int:
+    """How many packets are less than the probe, in one pass without sorting"""
+    probe_key = probe.sort_key
+    return sum(1 for packet in packets if packet.sort_key < probe_key)
+
+
+def ranks_of(packets: Iterable[Packet], probes: List[Packet]) -> List[int]:
+    """
+    rank_of for several probes in a single pass over the packets.
+    Each packet is placed among the sorted probe keys with a binary search.
+    """
+    order = sorted(range(len(probes)), key=lambda i: probes[i].sort_key)
+    probe_keys = [probes[i].sort_key for i in order]
+    # Packets less than the probe at each sorted position, but not the one before it
+    counts = [0] * (len(probes) + 1)
+    for packet in packets:
+        counts[bisect_right(probe_keys, packet.sort_key)] += 1
+    ranks = [0] * len(probes)
+    rank = 0
+    for position, i in enumerate(order):
+        rank += counts[position]
+        ranks[i] = rank
+    return ranks
 
-        
 
 input_path = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-packet_pairs = []
 
-with open(input_path, 'r') as f:
+def read_pairs(lines: Iterable[str]) -> Iterator[PacketPair]:
     packet_1 = None
-    for packet in f:
-        if packet == '\n':
-            continue
+    for packet in read_packets(lines):
         if packet_1 is None:
-            packet_1 = parse_packet(packet)
+            packet_1 = packet
         else:
-            packet_2 = parse_packet(packet)
-            packet_pair = PacketPair(packet_1, packet_2)
-            packet_pairs.append(packet_pair)
+            yield PacketPair(packet_1, packet)
             packet_1 = None
 
 
-# Get the 1-indexed indices of packets in the right order
-packet_order = []
-for i, packet_pair in enumerate(packet_pairs):
-    if packet_pair.check_packet_order():
-        packet_order.append(i + 1)
+def parse(input_path) -> List[PacketPair]:
+    packet_pairs = []
+    with open_input(input_path) as f:
+        for record in f.records():
+            if len(record) != 2:
+                raise ValueError(f"Expected a pair of packets, got {len(record)} lines")
+            packet_1, packet_2 = (parse_packet(str(line, 'ascii')) for line in record)
+            packet_pairs.append(PacketPair(packet_1, packet_2))
+    return packet_pairs
+
+
+def _order_chunk(input_path, start: int, end: int) -> Tuple[int, List[int]]:
+    """Number of pairs in the byte range, and the 1-indexed ones in the right order"""
+    ordered = []
+    count = 0
+    with open_input(input_path) as f:
+        lines = (str(line, 'ascii') for line in f.lines(start, end))
+        for count, packet_pair in enumerate(read_pairs(lines), 1):
+            if packet_pair.check_packet_order():
+                ordered.append(count)
+    return count, ordered
+
+
+def ordered_pair_indices(input_path, workers: Optional[int] = None, chunk_size: int = 1 << 24) -> Iterator[int]:
+    """
+    Yields the 1-indexed pairs in the right order straight from a file, like
+    part_1 but without parsing it up front. The file is split into byte
+    ranges that worker processes parse and compare themselves. Results come
+    back in file order, offset by the number of pairs in earlier ranges.
+    """
+    with open_input(input_path) as f:
+        starts, ends = zip(*f.record_chunks(chunk_size))
+    paths = [input_path] * len(starts)
+
+    def offset_indices(results: Iterable[Tuple[int, List[int]]]) -> Iterator[int]:
+        offset = 0
+        for count, ordered in results:
+            for index in ordered:
+                yield offset + index
+            offset += count
+
+    if workers == 1:
+        yield from offset_indices(map(_order_chunk, paths, starts, ends))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from offset_indices(executor.map(_order_chunk, paths, starts, ends))
+
 
-print(f"Sum of correct packet order indices: {sum(packet_order)}")
+def part_1(packet_pairs: List[PacketPair]) -> int:
+    # Get the 1-indexed indices of packets in the right order
+    packet_order = []
+    for i, packet_pair in enumerate(packet_pairs):
+        if packet_pair.check_packet_order():
+            packet_order.append(i + 1)
+    return sum(packet_order)
 
-# Part 2
-all_packets = []
-for packet_pair in packet_pairs:
-    all_packets.append(packet_pair.packet_1)
-    all_packets.append(packet_pair.packet_2)
 
-# Add divider packets
-divider_packets = [
-    Packet([[2]]),
-    Packet([[6]]),
-]
-all_packets.extend(divider_packets)
+def part_2(packet_pairs: List[PacketPair]) -> int:
+    divider_packets = [
+        Packet.from_contents([[2]]),
+        Packet.from_contents([[6]]),
+    ]
+    packets = (packet for packet_pair in packet_pairs for packet in (packet_pair.packet_1, packet_pair.packet_2))
 
-all_packets.sort()
+    # A divider's 1-indexed position in the sorted packets is one more than
+    # the number of packets and other dividers that sort before it
+    packet_ranks = ranks_of(packets, divider_packets)
+    divider_ranks = ranks_of(divider_packets, divider_packets)
+    divider_indices = [packet_rank + divider_rank + 1 for packet_rank, divider_rank in zip(packet_ranks, divider_ranks)]
 
-# Find the indices of the divider packets
-divider_indices = []
-for i, packet in enumerate(all_packets):
-    if packet in divider_packets:
-        divider_indices.append(i + 1)
+    return reduce(lambda x, y: x * y, divider_indices)
 
-decoder_key = reduce(lambda x, y: x * y, divider_indices)
 
-print(f"Decoder key: {decoder_key}")
\ No newline at end of file
+if __name__ == '__main__':
+    packet_pairs = parse(input_path)
+    print(f"Sum of correct packet order indices: {part_1(packet_pairs)}")
+    # Part 2
+    print(f"Decoder key: {part_2(packet_pairs)}")
@@ -1,4 +1,7 @@
 from typing import Tuple, List, Optional
+from collections import Counter
+import argparse
+import gzip
 import os
 
 
@@ -10,6 +13,12 @@ class Coordinate:
     def __repr__(self):
         return f"({self.x}, {self.y})"
 
+    def __eq__(self, other):
+        return isinstance(other, Coordinate) and self.x == other.x and self.y == other.y
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
 class Line:
     def __init__(self, origin: Coordinate, destination: Coordinate):
         self.origin = origin
@@ -32,30 +41,233 @@ class Line:
         return f"{self.origin}->{self.destination}"
 
 
+# Cells are stored as small integer codes, and only
+# converted to characters for printing
+AIR = 0
+ROCK = 1
+FALLING = 2
+SAND = 3
+SOURCE = 4
+# Outside the grid, or in columns the grid hasn't expanded to yet
+EDGE = 5
+CELL_CHARACTERS = '.#~o+'
+CELL_CODES = {character: code for code, character in enumerate(CELL_CHARACTERS)}
+RENDER_TABLE = bytes.maketrans(bytes(range(len(CELL_CHARACTERS))), CELL_CHARACTERS.encode())
+
+
+class CaveGrid:
+    """
+    Cell storage for a cave, holding the cells between min_x and max_x.
+
+    Cells are kept in one flat bytearray, row by row, so a cell is found
+    with index arithmetic and its neighbours below are at fixed offsets
+    (index + stride, and one either side of that). Each row has spare
+    capacity, and an EDGE column on either side. Spare cells are also
+    EDGE until the grid expands to them, so reading EDGE means the cell
+    is outside the grid without any bounds checks. There is an extra
+    EDGE row at the bottom for the same reason.
+
+    Capacity at least doubles whenever it runs out, so growing the grid
+    sideways costs amortised O(height) per new column. A floor, if any,
+    is implicit and reads as rock at every x. It isn't stored, so the
+    EDGE row below the stored rows is where the floor is.
+    """
+    def __init__(self, min_x: int, max_x: int, height: int, floor_y: Optional[int] = None):
+        self.min_x = min_x
+        self.max_x = max_x
+        self.height = height
+        self.floor_y = floor_y
+        # The floor row is not stored
+        self.stored_height = floor_y if floor_y is not None else height
+        # x of the first cell after the EDGE column in each row
+        self.origin_x = min_x
+        self.capacity = max_x - min_x + 1
+        self.stride = self.capacity + 2
+        self.cells = bytearray([EDGE]) * (self.stride * (self.stored_height + 1))
+        for x in range(min_x, max_x + 1):
+            self.fill_column(x)
+
+    @property
+    def width(self) -> int:
+        return self.max_x - self.min_x + 1
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.stride + x - self.origin_x + 1
+
+    def position(self, index: int) -> Tuple[int, int]:
+        y, column = divmod(index, self.stride)
+        return column - 1 + self.origin_x, y
+
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= y < self.height and self.min_x <= x <= self.max_x
+
+    def __getitem__(self, cell: Tuple[int, int]) -> str:
+        x, y = cell
+        if y == self.floor_y:
+            return '#'
+        return CELL_CHARACTERS[self.cells[self.index(x, y)]]
+
+    def __setitem__(self, cell: Tuple[int, int], value: str):
+        x, y = cell
+        if y == self.floor_y:
+            if value != '#':
+                raise Exception("The floor can't be changed")
+            return
+        self.cells[self.index(x, y)] = CELL_CODES[value]
+
+    def fill_column(self, x: int):
+        """Fills a new column with air"""
+        index = self.index(x, 0)
+        self.cells[index:index + self.stride * self.stored_height:self.stride] = bytes([AIR]) * self.stored_height
+
+    def has_capacity(self, x: int) -> bool:
+        return self.origin_x <= x < self.origin_x + self.capacity
+
+    def expand_to(self, x: int):
+        """Expands the grid sideways to include column x"""
+        if not self.has_capacity(x):
+            self.reallocate(x)
+        for new_x in range(x, self.min_x):
+            self.fill_column(new_x)
+        for new_x in range(self.max_x + 1, x + 1):
+            self.fill_column(new_x)
+        self.min_x = min(self.min_x, x)
+        self.max_x = max(self.max_x, x)
+
+    def reallocate(self, x: int):
+        """Moves the cells into a grid with enough capacity for column x"""
+        if x < self.origin_x:
+            additional_width = max(self.origin_x - x, self.capacity)
+            shift = additional_width
+        else:
+            additional_width = max(x - (self.origin_x + self.capacity) + 1, self.capacity)
+            shift = 0
+        old_cells, old_stride = self.cells, self.stride
+        self.capacity += additional_width
+        self.stride = self.capacity + 2
+        self.origin_x -= shift
+        self.cells = bytearray([EDGE]) * (self.stride * (self.stored_height + 1))
+        for y in range(self.stored_height):
+            old_start = y * old_stride + 1
+            start = y * self.stride + 1 + shift
+            self.cells[start:start + old_stride - 2] = old_cells[old_start:old_start + old_stride - 2]
+
+    def row_string(self, y: int) -> str:
+        if y == self.floor_y:
+            return '#' * self.width
+        start = self.index(self.min_x, y)
+        return self.cells[start:start + self.width].translate(RENDER_TABLE).decode()
+
+
+class CaveObserver:
+    """
+    Receives events from a Cave during the simulation.
+    Override the events of interest, the rest do nothing.
+    """
+    def grain_settled(self, cave: 'Cave', coordinate: Coordinate, path_length: int):
+        """A grain came to rest after falling path_length cells"""
+
+    def abyss_reached(self, cave: 'Cave', path_length: int):
+        """A grain fell into the abyss after falling path_length cells"""
+
+    def grid_expanded(self, cave: 'Cave', min_x: int, max_x: int):
+        """The grid grew sideways, and now covers min_x to max_x"""
+
+
+class FrameRecorder(CaveObserver):
+    """
+    Writes a snapshot of the cave to a gzip compressed text file
+    every `every` grains, and when the abyss is reached.
+    Use as a context manager, or call close when done.
+    """
+    def __init__(self, path: str, every: int = 1000):
+        self.file = gzip.open(path, 'wt')
+        self.every = every
+        self.grains = 0
+
+    def write_frame(self, cave: 'Cave'):
+        self.file.write(f"# grains {self.grains}\n")
+        self.file.write('\n'.join(cave.render_rows()))
+        self.file.write('\n\n')
+
+    def grain_settled(self, cave, coordinate, path_length):
+        self.grains += 1
+        if self.grains % self.every == 0:
+            self.write_frame(cave)
+
+    def abyss_reached(self, cave, path_length):
+        self.write_frame(cave)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> 'FrameRecorder':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FallStatistics(CaveObserver):
+    """Counts events, with a histogram of how far each grain fell"""
+    def __init__(self):
+        self.settled = 0
+        self.abyss = 0
+        self.expansions = 0
+        self.path_lengths = Counter()
+
+    def grain_settled(self, cave, coordinate, path_length):
+        self.settled += 1
+        self.path_lengths[path_length] += 1
+
+    def abyss_reached(self, cave, path_length):
+        self.abyss += 1
+
+    def grid_expanded(self, cave, min_x, max_x):
+        self.expansions += 1
+
+    @property
+    def mean_path_length(self) -> float:
+        total = sum(self.path_lengths.values())
+        if total == 0:
+            return 0.0
+        return sum(length * count for length, count in self.path_lengths.items()) / total
+
+    def __str__(self):
+        longest = max(self.path_lengths, default=0)
+        return (f"{self.settled} settled, {self.abyss} reached the abyss, {self.expansions} expansions, "
+                f"fell {self.mean_path_length:.1f} cells on average and {longest} at most")
+
+
 class Cave:
     pour_position = Coordinate(500, 0)
 
     def __init__(self, lines, with_floor=False):
+        self.lines = lines
         self.with_floor = with_floor
+        # Only notified outside the inner loop of pour, so
+        # having no observers costs nothing
+        self.observers: List[CaveObserver] = []
         # Get all x and y coordinates
         all_coordinates = [line.origin for line in lines] + [line.destination for line in lines]
-        self.min_x = min([coordinate.x for coordinate in all_coordinates])
+        min_x = min([coordinate.x for coordinate in all_coordinates])
         max_x = max([coordinate.x for coordinate in all_coordinates])
-        width = max_x - self.min_x + 1
         # Y coordinates are inverse i.e. 0 is at the top, 1 is below that
         max_y = max([coordinate.y for coordinate in all_coordinates])
         if self.with_floor:
             max_y += 2
+        self.max_y = max_y
         height = max_y + 1
-        self.grid = [['.' for _ in range(width)] for _ in range(height)]
+        # The floor is the bottom row, and is infinitely wide
+        self.grid = CaveGrid(min_x, max_x, height, floor_y=max_y if self.with_floor else None)
         for line in lines:
             for coordinate in line.cells_covered():
                 self[coordinate] = '#'
-        if self.with_floor:
-            for x in range(self.min_x, max_x + 1):
-                self[Coordinate(x, max_y)] = '#'
         # Set pour position in grid
         self[Cave.pour_position] = '+'
+        # Grid indices of the cells the last grain fell through,
+        # from the pour position down
+        self.fall_path = [self.grid.index(Cave.pour_position.x, Cave.pour_position.y)]
 
         
     def pretty_print(self):
@@ -64,15 +276,25 @@ class Cave:
         Includes row numbers.
         Print column numbers vertically above.
         """
-        col_numbers = [self.min_x + i for i in range(len(self.grid[0]))]
+        col_numbers = [self.min_x + i for i in range(self.grid.width)]
         # Get the max number of digits in the column numbers
         max_digits = len(str(max(col_numbers)))
         # Print column numbers vertically
         column_strings = [''.join([str(col_number)[i] for col_number in col_numbers]) for i in range(max_digits)]
         for row in column_strings:
             print(f"{' ' * 3} {row}")
-        for i, row in enumerate(self.grid):
-            print(f"{i:3d} {''.join(row)}")
+        for i, row in enumerate(self.render_rows()):
+            print(f"{i:3d} {row}")
+
+    def render_rows(self) -> List[str]:
+        return [self.grid.row_string(y) for y in range(self.grid.height)]
+
+    def add_observer(self, observer: CaveObserver):
+        self.observers.append(observer)
+
+    @property
+    def min_x(self) -> int:
+        return self.grid.min_x
 
 
     
@@ -83,38 +305,99 @@ class Cave:
         return value == '.' or value == '~'
 
     
-    def pour(self) -> bool:
-        current_drop = Cave.pour_position
+    def pour(self) -> Optional[Coordinate]:
+        """
+        Pours one grain of sand.
+        Returns where it came to rest, or None if it fell into the abyss
+        or the pour position is blocked.
+
+        A grain follows the same path as the previous grain until the cell
+        where that grain came to rest. So rather than starting each grain
+        at the pour position, it resumes from the end of the previous path,
+        making the total work linear in the number of settled grains.
+        """
+        path = self.fall_path
+        if not path:
+            return None
+        cells = self.grid.cells
+        stride = self.grid.stride
         while True:
-            self[current_drop] = '~'
-            drop_candidates = [
-                # Below
-                Coordinate(current_drop.x, current_drop.y + 1),
-                # Left diagonal
-                Coordinate(current_drop.x - 1, current_drop.y + 1),
-                # Right diagonal
-                Coordinate(current_drop.x + 1, current_drop.y + 1),
-            ]
+            current_drop = path[-1]
+            cells[current_drop] = FALLING
+            below = current_drop + stride
             abyss = False
-            poured = False
-            for drop_candidate in drop_candidates:
-                coordinate = self[drop_candidate]
-                if coordinate is None:
-                    abyss = True
-                    continue
-                if self.can_pour(drop_candidate):
-                    current_drop = drop_candidate
-                    poured = True
+            expanded = False
+            # Below, then left diagonal, then right diagonal
+            for drop_candidate in (below, below - 1, below + 1):
+                value = cells[drop_candidate]
+                if value == AIR or value == FALLING:
+                    path.append(drop_candidate)
                     break
-            if poured:
-                continue
-            if abyss:
-                return None
-            # All possible paths are blocked. Block this cell
-            self[current_drop] = 'o'
-            return current_drop
+                if value == EDGE:
+                    x, y = self.grid.position(drop_candidate)
+                    if y == self.grid.floor_y:
+                        # The floor isn't stored, but blocks like rock. The grid
+                        # still widens to cover it, as it would for any cell read
+                        if self.expand_grid(Coordinate(x, y)):
+                            expanded = True
+                            break
+                        continue
+                    if self.expand_grid(Coordinate(x, y)):
+                        expanded = True
+                        break
+                    abyss = True
+            else:
+                if abyss:
+                    for observer in self.observers:
+                        observer.abyss_reached(self, len(path) - 1)
+                    return None
+                # All possible paths are blocked. Block this cell
+                cells[current_drop] = SAND
+                settled = Coordinate(*self.grid.position(current_drop))
+                for observer in self.observers:
+                    observer.grain_settled(self, settled, len(path) - 1)
+                path.pop()
+                return settled
+            if expanded:
+                # Expanding may have moved the cells, so look again
+                cells = self.grid.cells
+                stride = self.grid.stride
 
     
+    def count_floor_fill(self) -> int:
+        """
+        Counts the grains that come to rest before the pour position is
+        blocked, without pouring them. Only possible with a floor.
+
+        With a floor, every cell that can be reached from the pour position
+        by moving down or diagonally down fills with sand. The reachable
+        cells of each row are tracked as bits of a Python int, so each row
+        is found from the one above with a few shifts and a mask of rocks.
+        """
+        if not self.with_floor:
+            raise Exception("Fill counting requires a floor")
+        source = Cave.pour_position
+        # Sand spreads at most one column per row, so with this offset
+        # the bit index (x - offset) of every reachable cell is positive
+        offset = source.x - self.max_y
+        max_bit = 2 * self.max_y
+        rocks = [0] * self.max_y
+        for line in self.lines:
+            for coordinate in line.cells_covered():
+                bit = coordinate.x - offset
+                if source.y <= coordinate.y < self.max_y and 0 <= bit <= max_bit:
+                    rocks[coordinate.y] |= 1 << bit
+        reachable = 1 << (source.x - offset)
+        settled = 0
+        for y in range(source.y, self.max_y):
+            if y > source.y:
+                reachable = (reachable | reachable << 1 | reachable >> 1) & ~rocks[y]
+            if not reachable:
+                break
+            settled += bin(reachable).count('1')
+        return settled
+
+
     def pour_n(self, n: int):
         for pours in range(n):
             result = self.pour()
@@ -129,26 +412,18 @@ class Cave:
             if self.expand_grid(coordinate):
                 return self[coordinate]
             return None
-        return self.grid[coordinate.y][coordinate.x - self.min_x]
+        return self.grid[coordinate.x, coordinate.y]
 
 
     def __setitem__(self, coordinate: Coordinate, value: str):
         if not self.coordinate_exists(coordinate):
             raise Exception(f"Coordinate {coordinate} does not exist")
-        self.grid[coordinate.y][coordinate.x - self.min_x] = value
+        self.grid[coordinate.x, coordinate.y] = value
 
 
     def coordinate_exists(self, coordinate: Coordinate) -> bool:
         """If a coordinate already exists in the grid"""
-        if coordinate.y < 0:
-            return False
-        if coordinate.y >= len(self.grid):
-            return False
-        if coordinate.x < self.min_x:
-            return False
-        if coordinate.x >= self.min_x + len(self.grid[0]):
-            return False
-        return True
+        return self.grid.contains(coordinate.x, coordinate.y)
 
 
     def expand_grid(self, coordinate: Coordinate) -> bool:
@@ -163,67 +438,106 @@ class Cave:
         if self.coordinate_exists(coordinate):
             return False
         # Can expand on X, but not Y
-        if coordinate.y < 0 or coordinate.y >= len(self.grid):
+        if coordinate.y < 0 or coordinate.y >= self.grid.height:
             return False
-        # Expand on X
-        if coordinate.x < self.min_x:
-            additional_width = self.min_x - coordinate.x
-            self.grid = [['.' for _ in range(additional_width)] + row for row in self.grid]
-            self.min_x = coordinate.x
-            self.grid[-1] = ['#' for _ in range(len(self.grid[-1]))]
-            return True
-        if coordinate.x >= self.min_x + len(self.grid[0]):
-            additional_width = coordinate.x - (self.min_x + len(self.grid[0])) + 1
-            self.grid = [row + ['.' for _ in range(additional_width)] for row in self.grid]
-            self.grid[-1] = ['#' for _ in range(len(self.grid[-1]))]
-            return True
+        # Expand on X. If the cells move, the fall path has to move with them
+        if self.grid.has_capacity(coordinate.x):
+            self.grid.expand_to(coordinate.x)
+        else:
+            fall_path = [self.grid.position(index) for index in self.fall_path]
+            self.grid.expand_to(coordinate.x)
+            self.fall_path[:] = [self.grid.index(x, y) for x, y in fall_path]
+        for observer in self.observers:
+            observer.grid_expanded(self, self.grid.min_x, self.grid.max_x)
+        return True
+
 
 
+def pour_until_abyss(cave: Cave) -> int:
+    """
+    Pours sand until a grain falls into the abyss.
+    Returns the number of grains that came to rest.
+    """
+    poured = 0
+    while True:
+        result = cave.pour()
+        if not result:
+            break
+        poured += 1
+    return poured
+
+
+def pour_until_blocked(cave: Cave) -> int:
+    """
+    Pours sand until the pour position is blocked.
+    Returns the number of grains poured, including the blocking grain.
+    """
+    pours = 0
+    while True:
+        result = cave.pour()
+        pours += 1
+        # Should be impossible as grid can expand infinitely
+        if result is None:
+            break
+        if result == Cave.pour_position:
+            break
+    return pours
+
 
 input_path = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-lines = []
-with open(input_path, 'r') as f:
-    for line in f:
-        previous_coordinate = None
-        coordinates = line.split('->')
-        for coordinate in coordinates:
-            coordinate = coordinate.strip()
-            x, y = coordinate.split(',')
-            x = int(x)
-            y = int(y)
-            if previous_coordinate is None:
-                previous_coordinate = Coordinate(x, y)
-            else:
-                line = Line(previous_coordinate, Coordinate(x, y))
-                lines.append(line)
-                previous_coordinate = Coordinate(x, y)
-
-
-cave = Cave(lines)
-cave.pretty_print()
-
-poured = 0
-while True:
-    result = cave.pour()
-    if not result:
-        break
-    poured += 1
-print(f"Poured {poured} times before reaching the abyss")
-
-cave.pretty_print()
-
-# Part 2
-cave_2 = Cave(lines, with_floor=True)
-# Keep pouring until the pour position is returned
-pours = 0
-while True:
-    result = cave_2.pour()
-    pours += 1
-    # Should be impossible as grid can expand infinitely
-    if result is None:
-        break
-    if result == Cave.pour_position:
-        break
-    
-print(f"Poured {pours} times before reaching the pour position")
\ No newline at end of file
+
+def parse(input_path) -> List[Line]:
+    lines = []
+    with open(input_path, 'r') as f:
+        for line in f:
+            previous_coordinate = None
+            coordinates = line.split('->')
+            for coordinate in coordinates:
+                coordinate = coordinate.strip()
+                x, y = coordinate.split(',')
+                x = int(x)
+                y = int(y)
+                if previous_coordinate is None:
+                    previous_coordinate = Coordinate(x, y)
+                else:
+                    line = Line(previous_coordinate, Coordinate(x, y))
+                    lines.append(line)
+                    previous_coordinate = Coordinate(x, y)
+    return lines
+
+
+def part_1(lines: List[Line]) -> int:
+    return pour_until_abyss(Cave(lines))
+
+
+def part_2(lines: List[Line]) -> int:
+    # Same as pouring until the pour position is blocked
+    return Cave(lines, with_floor=True).count_floor_fill()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--print', action='store_true', help='Print the part 1 cave before and after pouring')
+    parser.add_argument('--frames', help='Record part 1 frames to this gzip file')
+    parser.add_argument('--every', type=int, default=1000, help='Grains between recorded frames')
+    args = parser.parse_args()
+
+    lines = parse(input_path)
+    cave = Cave(lines)
+    statistics = FallStatistics()
+    cave.add_observer(statistics)
+    if args.frames:
+        recorder = FrameRecorder(args.frames, args.every)
+        cave.add_observer(recorder)
+    if args.print:
+        cave.pretty_print()
+    print(f"Poured {pour_until_abyss(cave)} times before reaching the abyss")
+    print(statistics)
+    if args.frames:
+        recorder.close()
+    if args.print:
+        cave.pretty_print()
+
+    # Part 2
+    print(f"Poured {part_2(lines)} times before reaching the pour position")
@@ -1,4 +1,18 @@
 import os
+import sys
+from collections import Counter
+from typing import Dict, Tuple
+
+# NumPy is optional, it is only used to count rounds faster
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
 # Define rock paper scissors moves
 # Each class should implement comparison operators
 # Each class also has a static score attribute
@@ -54,25 +68,6 @@ your_moves = {
 # Read elf moves and your moves from input file
 input_path = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-# Read line-by-line
-# First letter is elf move
-# Second letter is your move
-total_score = 0
-with open(input_path, 'r') as f:
-    for line in f:
-        elf_move = elf_moves[line[0]]
-        your_move = your_moves[line[2]]
-        # Default match score is zero. This is score for a loss
-        match_score = 0
-        if elf_move == your_move:
-            match_score = 3
-        elif your_move > elf_move:
-            match_score = 6
-        game_score = match_score + your_move.score
-        total_score += game_score
-
-print(f'Total score: {total_score}')
-        
 # Part 2
 your_results = {
     'X': 'lose',
@@ -94,21 +89,114 @@ def get_move_from_result(opponent_move, result):
         return None
 
 
-total_score_2 = 0
-with open(input_path, 'r') as f:
-    for line in f:
-        elf_move = elf_moves[line[0]]
-        # Get the specified result and find the move that
-        # would result in that outcome in light of the elf's move
-        your_result = your_results[line[2]]
-        your_move = get_move_from_result(elf_move, your_result)
-        match_score = 0
-        if your_result == 'draw':
-            match_score = 3
-        elif your_result == 'win':
-            match_score = 6
-        game_score = match_score + your_move.score
-        total_score_2 += game_score
-
-print(f'Total score 2: {total_score_2}')
-        
+def score_part_1(elf_code, your_code):
+    elf_move = elf_moves[elf_code]
+    your_move = your_moves[your_code]
+    # Default match score is zero. This is score for a loss
+    match_score = 0
+    if elf_move == your_move:
+        match_score = 3
+    elif your_move > elf_move:
+        match_score = 6
+    return match_score + your_move.score
+
+
+def score_part_2(elf_code, your_code):
+    elf_move = elf_moves[elf_code]
+    # Get the specified result and find the move that
+    # would result in that outcome in light of the elf's move
+    your_result = your_results[your_code]
+    your_move = get_move_from_result(elf_move, your_result)
+    match_score = 0
+    if your_result == 'draw':
+        match_score = 3
+    elif your_result == 'win':
+        match_score = 6
+    return match_score + your_move.score
+
+
+# Only 9 different rounds exist, so score each once up front.
+# Rounds are ordered so the elf code is the row and your code the column.
+round_codes = [(elf_code, your_code) for elf_code in 'ABC' for your_code in 'XYZ']
+part_1_scores = {codes: score_part_1(*codes) for codes in round_codes}
+part_2_scores = {codes: score_part_2(*codes) for codes in round_codes}
+
+
+def _complete_lines(data) -> Tuple[bytes, bytes]:
+    """
+    The data with a line ending after its last line, and that line ending.
+    Every line has the same ending, so the first line gives it.
+    """
+    ending = b'\r\n' if bytes(data[3:4]) == b'\r' else b'\n'
+    if len(data) % (3 + len(ending)) == 3:
+        # The last line has no trailing line ending
+        data = bytes(data) + ending
+    return data, ending
+
+
+def count_rounds(data: bytes) -> Counter:
+    """Occurrences of each of the 9 'A X' lines, one bytes.count scan each"""
+    data, ending = _complete_lines(data)
+    counts = Counter()
+    for elf_code, your_code in round_codes:
+        count = data.count(f"{elf_code} {your_code}".encode() + ending)
+        if count:
+            counts[elf_code, your_code] = count
+    # Whole lines can't overlap, so if they cover all the data
+    # then every line is one of them
+    if sum(counts.values()) * (3 + len(ending)) != len(data):
+        raise ValueError("Every line must be an elf code and your code, such as 'A X'")
+    return counts
+
+
+def numpy_count_rounds(data) -> Counter:
+    """count_rounds as a histogram over the 'A X\\n' or 'A X\\r\\n' lines"""
+    data, ending = _complete_lines(data)
+    width = 3 + len(ending)
+    if len(data) % width:
+        raise ValueError("Every line must be an elf code and your code, such as 'A X'")
+    lines = np.frombuffer(data, dtype=np.uint8).reshape(-1, width)
+    elf_codes = lines[:, 0].astype(np.intp) - ord('A')
+    your_codes = lines[:, 2].astype(np.intp) - ord('X')
+    valid = (lines[:, 1] == ord(' ')) & (elf_codes >= 0) & (elf_codes < 3) & (your_codes >= 0) & (your_codes < 3)
+    for column, byte in enumerate(ending, 3):
+        valid &= lines[:, column] == byte
+    if not valid.all():
+        raise ValueError("Every line must be an elf code and your code, such as 'A X'")
+    histogram = np.bincount(elf_codes * 3 + your_codes, minlength=9)
+    return Counter({codes: int(count) for codes, count in zip(round_codes, histogram) if count})
+
+
+def parse(input_path, chunk_size: int = 1 << 24) -> Counter:
+    # Each line is an elf move, then your move (part 1) or the desired result (part 2).
+    # Rounds are independent, so only how often each one occurs matters.
+    # Counted a chunk of whole lines at a time to bound memory.
+    counts = Counter()
+    with open_input(input_path) as f:
+        for start, end in f.line_chunks(chunk_size):
+            chunk = f.view[start:end]
+            if np is not None:
+                counts.update(numpy_count_rounds(chunk))
+            else:
+                counts.update(count_rounds(chunk.tobytes()))
+            chunk.release()
+    return counts
+
+
+def score(rounds: Dict[Tuple[str, str], int], scores: Dict[Tuple[str, str], int]) -> int:
+    # Dot product of how often each round occurs with its score
+    return sum(count * scores[codes] for codes, count in rounds.items())
+
+
+def part_1(rounds: Dict[Tuple[str, str], int]) -> int:
+    return score(rounds, part_1_scores)
+
+
+def part_2(rounds: Dict[Tuple[str, str], int]) -> int:
+    return score(rounds, part_2_scores)
+
+
+if __name__ == '__main__':
+    rounds = parse(input_path)
+    print(f'Total score: {part_1(rounds)}')
+    print(f'Total score 2: {part_2(rounds)}')
@@ -1,4 +1,19 @@
 import os
+import sys
+from functools import reduce
+from operator import and_, or_
+from typing import Iterator, Tuple
+
+# NumPy is optional, NumpyRucksacks is only used when it is installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
 # Rucksack stores an array of items
 # Each item is represented by a character (case sensitive)
 # The first 1/2 of the items are in compartment 1
@@ -25,6 +40,10 @@ class Rucksack:
     def common_items(self):
         return list(set(self.compartment_1).intersection(set(self.compartment_2)))
 
+    @property
+    def compartment_masks(self) -> Tuple[int, int]:
+        return items_mask(self.compartment_1), items_mask(self.compartment_2)
+
 
 # Map item priorities
 # a-z = 1:26
@@ -35,47 +54,175 @@ for i in range(1, 27):
 for i in range(1, 27):
     item_priorities[chr(i + 64)] = i + 26
 
+# Item sets as bitmasks, with bit (priority - 1) set for each item type.
+# Indexed by byte, so a common item's priority is the bit_length of the
+# intersection, and anything that isn't an item maps to no bits.
+item_bits = [0] * 256
+for item, priority in item_priorities.items():
+    item_bits[ord(item)] = 1 << (priority - 1)
+
+# Priority of each byte, 0 if it isn't an item, for NumpyRucksacks
+if np is not None:
+    priority_table = np.zeros(256, dtype=np.uint8)
+    for item, priority in item_priorities.items():
+        priority_table[ord(item)] = priority
+
+
+def items_mask(items) -> int:
+    # Items can be a str or any bytes-like object
+    if isinstance(items, str):
+        items = items.encode('ascii')
+    return reduce(or_, map(item_bits.__getitem__, items), 0)
+
+
+def single_item_priority(mask: int) -> int:
+    # A mask with exactly one bit set has no bits left when its lowest is cleared
+    if mask == 0 or mask & (mask - 1):
+        raise Exception('There should only be 1 common item')
+    return mask.bit_length()
+
+
+class NumpyRucksacks:
+    """
+    Every rucksack in a file as one array of item priorities, one byte per
+    item with 0 for anything else such as newlines. Common items are found
+    a block of lines at a time, by building a boolean line x priority
+    presence matrix for each compartment and combining them.
+    """
+    # Multiple of 3, so groups never span blocks
+    block_lines = 3 * (1 << 16)
+
+    def __init__(self, priorities, line_starts, line_ends):
+        self.priorities = priorities
+        # Byte range of each line, excluding its newline
+        self.line_starts = line_starts
+        self.line_ends = line_ends
+
+    @staticmethod
+    def from_file(input_path) -> 'NumpyRucksacks':
+        with open_input(input_path) as f:
+            data = np.frombuffer(f.view, dtype=np.uint8)
+            line_ends = np.flatnonzero(data == ord('\n'))
+            if data.size and data[-1] != ord('\n'):
+                line_ends = np.append(line_ends, data.size)
+            line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+            return NumpyRucksacks(priority_table[data], line_starts, line_ends)
+
+    def __len__(self) -> int:
+        return len(self.line_ends)
+
+    def presence(self, first: int, last: int):
+        """
+        (lines, 52) boolean matrices of the item types in each compartment,
+        for lines first to last. Column i is priority i + 1.
+        """
+        offset = self.line_starts[first]
+        block = self.priorities[offset:self.line_ends[last - 1]]
+        items = np.flatnonzero(block)
+        # Lines end at their newline, so an item is in the first line ending after it
+        lines = np.searchsorted(self.line_ends[first:last] - offset, items, side='right')
+        line_lengths = np.bincount(lines, minlength=last - first)
+        line_offsets = np.concatenate(([0], np.cumsum(line_lengths)[:-1]))
+        positions = np.arange(items.size) - line_offsets[lines]
+        compartments = (positions * 2 >= line_lengths[lines]).astype(np.intp)
+        presence = np.zeros((last - first, 2, 53), dtype=bool)
+        presence[lines, compartments, block[items]] = True
+        return presence[:, 0, 1:], presence[:, 1, 1:]
+
+    def blocks(self) -> Iterator[Tuple[object, object]]:
+        for first in range(0, len(self), self.block_lines):
+            yield self.presence(first, min(first + self.block_lines, len(self)))
+
+    @staticmethod
+    def single_priorities(common):
+        if not (common.sum(axis=1) == 1).all():
+            raise Exception('There should only be 1 common item')
+        return common.argmax(axis=1) + 1
+
+    def priority_sum(self) -> int:
+        """Part 1, the priorities of the item in both compartments"""
+        return sum(int(self.single_priorities(compartment_1 & compartment_2).sum())
+                   for compartment_1, compartment_2 in self.blocks())
+
+    def group_priority_sum(self) -> int:
+        """Part 2, the priorities of the item in all 3 rucksacks of each group"""
+        total = 0
+        for compartment_1, compartment_2 in self.blocks():
+            items = compartment_1 | compartment_2
+            full = len(items) // 3 * 3
+            common = items[:full].reshape(-1, 3, 52).all(axis=1)
+            if full < len(items):
+                # Like part_2, a trailing partial group still counts
+                common = np.vstack([common, items[full:].all(axis=0)])
+            total += int(self.single_priorities(common).sum())
+        return total
+
+
 # Read rucksack items from input file
 input_path = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-priority_sum = 0
-with open(input_path, 'r') as f:
-    for line in f:
-        rucksack = Rucksack(line.strip())
+
+def parse(input_path):
+    if np is not None:
+        return NumpyRucksacks.from_file(input_path)
+    with open_input(input_path) as f:
+        return [Rucksack(str(line, 'ascii').strip()) for line in f.lines()]
+
+
+def part_1(rucksacks):
+    if isinstance(rucksacks, NumpyRucksacks):
+        return rucksacks.priority_sum()
+    priority_sum = 0
+    for rucksack in rucksacks:
         # Find the common item (by definition should only be 1)
-        common_items = rucksack.common_items
-        if len(common_items) != 1:
-            raise Exception('There should only be 1 common item')
-        common_item = common_items[0]
-        priority_sum += item_priorities[common_item]
-
-print(f"Priority sum of common items: {priority_sum}")
-
-# Part 2
-part_2_sum = 0
-with open(input_path, 'r') as f:
-    # Read in sets of 3 lines
-    while True:
-        i = 0
-        group_rucksacks = []
-        while i < 3:
-            line = f.readline()
-            # EOF
-            if not line:
-                break
-            group_rucksacks.append(Rucksack(line.strip()))
-            i += 1
-        if len(group_rucksacks) == 0:
-            break
+        compartment_1, compartment_2 = rucksack.compartment_masks
+        priority_sum += single_item_priority(compartment_1 & compartment_2)
+    return priority_sum
+
+
+def part_2(rucksacks):
+    if isinstance(rucksacks, NumpyRucksacks):
+        return rucksacks.group_priority_sum()
+    part_2_sum = 0
+    # Read in sets of 3 rucksacks
+    for i in range(0, len(rucksacks), 3):
+        group_rucksacks = rucksacks[i:i + 3]
         # Find intersection of all 3 rucksacks
         # There should only be 1 common item
-        common_items = set.intersection(*[set(r.items) for r in group_rucksacks])
-        if len(common_items) != 1:
-            raise Exception('There should only be 1 common item')
-        common_item = common_items.pop()
-        part_2_sum += item_priorities[common_item]
+        common_items = reduce(and_, (items_mask(r.items) for r in group_rucksacks))
+        part_2_sum += single_item_priority(common_items)
+    return part_2_sum
+
+
+def solve_streaming(input_path) -> Tuple[int, int]:
+    """
+    Both parts in one pass over the file, without building rucksacks.
+    Each half line becomes a bitmask, and only the running intersection
+    of the current group of 3 is kept.
+    """
+    priority_sum = 0
+    group_sum = 0
+    group_items = -1
+    group_size = 0
+    with open_input(input_path) as f:
+        for line in f.lines():
+            half = len(line) // 2
+            compartment_1 = reduce(or_, map(item_bits.__getitem__, line[:half]), 0)
+            compartment_2 = reduce(or_, map(item_bits.__getitem__, line[half:]), 0)
+            priority_sum += single_item_priority(compartment_1 & compartment_2)
+            group_items &= compartment_1 | compartment_2
+            group_size += 1
+            if group_size == 3:
+                group_sum += single_item_priority(group_items)
+                group_items = -1
+                group_size = 0
+    # Like part_2, a trailing partial group still counts
+    if group_size:
+        group_sum += single_item_priority(group_items)
+    return priority_sum, group_sum
 
-print(f"Sum of group priorities: {part_2_sum}")
 
-        
-        
\ No newline at end of file
+if __name__ == '__main__':
+    rucksacks = parse(input_path)
+    print(f"Priority sum of common items: {part_1(rucksacks)}")
+    print(f"Sum of group priorities: {part_2(rucksacks)}")
@@ -8,20 +8,33 @@ def expand_section(section):
 
 input_file = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-subset_count = 0
-overlap_count = 0
-with open(input_file, 'r') as f:
-    for line in f:
+def parse(input_file):
+    with open(input_file, 'r') as f:
         # Get expanded sections for each elf
         # Elves are separated by a comma
-        sections = [expand_section(section) for section in line.split(',')]
+        return [[expand_section(section) for section in line.split(',')] for line in f]
+
+
+def part_1(assignments):
+    subset_count = 0
+    for sections in assignments:
         if sections[0].issubset(sections[1]):
             subset_count += 1
         elif sections[1].issubset(sections[0]):
             subset_count += 1
+    return subset_count
+
+
+def part_2(assignments):
+    overlap_count = 0
+    for sections in assignments:
         # Check for overlap between sections
         if len(sections[0].intersection(sections[1])) > 0:
             overlap_count += 1
+    return overlap_count
+
 
-print(f'Number of subsets: {subset_count}')
-print(f'Number of overlaps: {overlap_count}')
\ No newline at end of file
+if __name__ == '__main__':
+    assignments = parse(input_file)
+    print(f'Number of subsets: {part_1(assignments)}')
+    print(f'Number of overlaps: {part_2(assignments)}')
@@ -55,45 +55,59 @@ class Environment:
 
 input_file = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-with open(input_file, 'r') as f:
-    # Get width of first line to determine number of stacks
-    n_stacks = len(f.readline()) // 4
-    environment = Environment(n_stacks)
-    f.seek(0)
-    for line in f:
-        # Check if stack labels have been reached. Line starts with 1
-        if line[1] == '1':
-            break
-        # Split line into n_stacks
-        stack_elements = [line[i:i+3] for i in range(0, len(line), 4)]
-        for stack_index, stack_element in enumerate(stack_elements):
-            # Check there is a crate here (index 1 is where it should be)
-            if stack_element[1] == ' ':
-                continue
-            # Add to bottom of stack
-            environment.add_to_bottom(stack_index, stack_element[1])
-
-    # Skip blank line before moves
-    next(f)
-    environment.pretty_print()
-    # Clone environment for part 2
-    environment_2 = copy.deepcopy(environment)
-
-    # Start parsing moves
-    move_pattern = re.compile(r'move (\d+) from (\d+) to (\d+)')
-    for line in f:
-        # Get move parameters
-        move = move_pattern.match(line)
-        n, from_stack, to_stack = [int(i) for i in move.groups()]
-        # Moves are 1-indexed
-        from_stack -= 1
-        to_stack -= 1
+def parse(input_file):
+    with open(input_file, 'r') as f:
+        # Get width of first line to determine number of stacks
+        n_stacks = len(f.readline()) // 4
+        environment = Environment(n_stacks)
+        f.seek(0)
+        for line in f:
+            # Check if stack labels have been reached. Line starts with 1
+            if line[1] == '1':
+                break
+            # Split line into n_stacks
+            stack_elements = [line[i:i+3] for i in range(0, len(line), 4)]
+            for stack_index, stack_element in enumerate(stack_elements):
+                # Check there is a crate here (index 1 is where it should be)
+                if stack_element[1] == ' ':
+                    continue
+                # Add to bottom of stack
+                environment.add_to_bottom(stack_index, stack_element[1])
+
+        # Skip blank line before moves
+        next(f)
+
+        # Start parsing moves
+        moves = []
+        move_pattern = re.compile(r'move (\d+) from (\d+) to (\d+)')
+        for line in f:
+            # Get move parameters
+            move = move_pattern.match(line)
+            n, from_stack, to_stack = [int(i) for i in move.groups()]
+            # Moves are 1-indexed
+            moves.append((from_stack - 1, to_stack - 1, n))
+    return environment, moves
+
+
+def part_1(puzzle):
+    # Clone environment so the parsed state can be reused
+    environment = copy.deepcopy(puzzle[0])
+    for from_stack, to_stack, n in puzzle[1]:
         environment.move(from_stack, to_stack, n)
+    return environment.top_stacks
+
+
+def part_2(puzzle):
+    environment_2 = copy.deepcopy(puzzle[0])
+    for from_stack, to_stack, n in puzzle[1]:
         environment_2.move_stack(from_stack, to_stack, n)
-        
+    return environment_2.top_stacks
+
+
+if __name__ == '__main__':
+    puzzle = parse(input_file)
+    puzzle[0].pretty_print()
     print("Part 1:")
-    environment.pretty_print()
-    print(f"Top of stacks: {environment.top_stacks}")
+    print(f"Top of stacks: {part_1(puzzle)}")
     print("Part 2:")
-    environment_2.pretty_print()
-    print(f"Top of stacks: {environment_2.top_stacks}")
\ No newline at end of file
+    print(f"Top of stacks: {part_2(puzzle)}")
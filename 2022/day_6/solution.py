@@ -1,4 +1,11 @@
+import io
 import os
+import sys
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
 input_file = os.path.join(os.path.dirname(__file__), 'input.txt')
 
 def find_unique_sequence(f, length):
@@ -10,11 +17,22 @@ def find_unique_sequence(f, length):
             return f.tell()
         buffer = buffer[1:] + f.read(1)
 
-# File is a single line
-with open(input_file, 'r') as f:
-    part_1 = find_unique_sequence(f, 4)
-    f.seek(0)
-    part_2 = find_unique_sequence(f, 14)
 
-print(f'Part 1: {part_1}')
-print(f'Part 2: {part_2}')
\ No newline at end of file
+def parse(input_file):
+    # File is a single line
+    with open_input(input_file) as f:
+        return next((str(line, 'ascii') for line in f.lines()), '')
+
+
+def part_1(signal):
+    return find_unique_sequence(io.StringIO(signal), 4)
+
+
+def part_2(signal):
+    return find_unique_sequence(io.StringIO(signal), 14)
+
+
+if __name__ == '__main__':
+    signal = parse(input_file)
+    print(f'Part 1: {part_1(signal)}')
+    print(f'Part 2: {part_2(signal)}')
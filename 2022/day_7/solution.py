@@ -1,126 +1,309 @@
 import os
+import sys
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
+# Files and directories use __slots__ to keep large trees compact,
+# and intern their names as the same names repeat across directories
 class File:
+    __slots__ = ('name', 'size', 'directory')
+
     def __init__(self, name: str, size: int, directory: 'Directory'):
-        self.name = name
+        self.name = sys.intern(name)
         self.size = size
         self.directory = directory
 
 class Directory:
+    __slots__ = ('name', 'subdirectories', 'files', 'parent', 'files_size', 'size', '_stale', '_full_path')
+
     def __init__(self, name, parent=None):
-        self.name = name
-        self.subdirectories = []
+        self.name = sys.intern(name)
+        # Keyed by name for O(1) lookups when changing directory
+        self.subdirectories = {}
         self.files = []
         self.parent = parent
+        # Total size of the files directly in this directory
+        self.files_size = 0
+        # Total size of all files in this directory and its subdirectories,
+        # only current while not _stale, so read it through get_size
+        self.size = 0
+        self._stale = False
+        # Built on first use by get_full_path
+        self._full_path = None
 
     def print_structure(self):
-        print(f"{self.get_full_path()} ({self.get_size()})")
-        for subdirectory in self.subdirectories:
-            subdirectory.print_structure()
+        # Explicit stack rather than recursion so deep trees can be printed
+        stack = [self]
+        while stack:
+            directory = stack.pop()
+            print(f"{directory.get_full_path()} ({directory.get_size()})")
+            stack.extend(reversed(directory.subdirectories.values()))
 
     def get_size(self):
-        size = 0
-        for subdirectory in self.subdirectories:
-            size += subdirectory.get_size()
-        for file in self.files:
-            size += file.size
-        return size
+        if self._stale:
+            # Find the stale directories below this one, then total them
+            # children first. Directories that aren't stale keep their size
+            stale = []
+            stack = [self]
+            while stack:
+                directory = stack.pop()
+                stale.append(directory)
+                stack.extend(child for child in directory.subdirectories.values() if child._stale)
+            for directory in reversed(stale):
+                directory.size = directory.files_size + sum(child.size for child in directory.subdirectories.values())
+                directory._stale = False
+        return self.size
+
+    def add_file(self, file: File):
+        self.files.append(file)
+        self.files_size += file.size
+        # Mark the ancestors' totals stale rather than updating them. The
+        # ancestors of a stale directory are already stale, so the walk stops
+        # there, and adding the files of one directory stays O(1) each
+        directory = self
+        while directory is not None and not directory._stale:
+            directory._stale = True
+            directory = directory.parent
+
+    def add_subdirectory(self, subdirectory: 'Directory'):
+        # Listing a directory again shouldn't replace its contents
+        if subdirectory.name in self.subdirectories:
+            return
+        self.subdirectories[subdirectory.name] = subdirectory
 
     def directory_from_components(self, components: list):
-        if len(components) == 0:
-            return self
-        else:
-            for subdirectory in self.subdirectories:
-                if subdirectory.name == components[0]:
-                    return subdirectory.directory_from_components(components[1:])
-            return None
+        directory = self
+        for component in components:
+            directory = directory.subdirectories.get(component)
+            if directory is None:
+                return None
+        return directory
 
     def get_full_path(self):
-        if self.parent is None:
-            return self.name
-        else:
-            return '/'.join([self.parent.get_full_path(), self.name])
+        if self._full_path is None:
+            # Find the directories up to the nearest cached ancestor,
+            # then build their paths from the top down
+            uncached = []
+            directory = self
+            while directory is not None and directory._full_path is None:
+                uncached.append(directory)
+                directory = directory.parent
+            for directory in reversed(uncached):
+                if directory.parent is None:
+                    directory._full_path = directory.name
+                else:
+                    directory._full_path = '/'.join([directory.parent._full_path, directory.name])
+        return self._full_path
 
     def __str__(self):
         return self.get_full_path()
 
 
+# Get all directories with their size
+# Walks the tree with an explicit stack so deep trees don't
+# hit the recursion limit or copy lists at every level
+def get_all_subdirectories(directory):
+    subdirectories = []
+    stack = list(reversed(directory.subdirectories.values()))
+    while stack:
+        subdirectory = stack.pop()
+        subdirectories.append(subdirectory)
+        stack.extend(reversed(subdirectory.subdirectories.values()))
+    return subdirectories
+
+
+class SizeIndex:
+    """
+    Directories sorted by size, for O(log n) size range queries.
+    """
+    def __init__(self, directories: List[Directory]):
+        self.directories = sorted(directories, key=lambda directory: directory.size)
+        self.sizes = [directory.size for directory in self.directories]
+
+    def smallest_at_least(self, size: int) -> Optional[Directory]:
+        i = bisect_left(self.sizes, size)
+        if i == len(self.sizes):
+            return None
+        return self.directories[i]
+
+    def at_most(self, size: int) -> List[Directory]:
+        return self.directories[:bisect_right(self.sizes, size)]
+
+
 class FileSystem:
     def __init__(self):
         self.root = Directory('/')
         self.current_directory = self.root
+        self._size_index = None
+
+    def change_directory(self, name: str):
+        if name == '..':
+            self.current_directory = self.current_directory.parent
+        elif name == '/':
+            self.current_directory = self.root
+        else:
+            subdirectory = self.current_directory.subdirectories.get(name)
+            if subdirectory is not None:
+                self.current_directory = subdirectory
+
+    def add_file(self, name: str, size: int):
+        self.current_directory.add_file(File(name, size, self.current_directory))
+        self._size_index = None
+
+    def add_directory(self, name: str):
+        self.current_directory.add_subdirectory(Directory(name, self.current_directory))
+        self._size_index = None
+
+    @property
+    def size_index(self) -> SizeIndex:
+        """
+        Index of all directories except the root. Rebuilt on first use
+        after a change, as a file changes the size of all its ancestors.
+        """
+        if self._size_index is None:
+            # Bring every size up to date before sorting by them
+            self.root.get_size()
+            self._size_index = SizeIndex(get_all_subdirectories(self.root))
+        return self._size_index
+
+    @property
+    def used_space(self) -> int:
+        return self.root.get_size()
 
     def directory_from_path(self, path: str):
         if path == '/':
             return self.root
-        components = path.split('/')
+        components = [component for component in path.split('/') if component]
         return self.root.directory_from_components(components)
 
 
 input_file = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-with open(input_file, 'r') as f:
+
+def text_lines(f) -> Iterator[str]:
+    # The transcript is ASCII, so each line decodes on its own
+    return (str(line, 'ascii') for line in f.lines())
+
+
+def read_transcript(lines: Iterable[str]) -> Iterator[tuple]:
+    """
+    Parses a terminal transcript one line at a time.
+    Yields ('cd', name), ('dir', name) and ('file', name, size) entries.
+    `ls` needs no handling, as every line that isn't a command
+    is output listing the current directory.
+    """
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == '$':
+            if parts[1] == 'cd':
+                yield ('cd', parts[2])
+        elif parts[0] == 'dir':
+            yield ('dir', parts[1])
+        else:
+            yield ('file', parts[1], int(parts[0]))
+
+
+class DirectorySize(NamedTuple):
+    path: str
+    size: int
+
+
+def stream_directory_sizes(lines: Iterable[str]) -> Iterator[DirectorySize]:
+    """
+    Yields the size of each directory once it is known, which is when the
+    transcript leaves it (or ends). Only the current path is held in memory,
+    so this doesn't build the tree. Assumes each directory is only explored
+    once, as in the puzzle transcripts.
+    """
+    # [path, size] for each directory in the current path. Each path is
+    # built from its parent's when entered, rather than from the whole stack
+    stack = [['/', 0]]
+
+    def leave() -> DirectorySize:
+        path, size = stack.pop()
+        if stack:
+            stack[-1][1] += size
+        return DirectorySize(path, size)
+
+    for entry in read_transcript(lines):
+        if entry[0] == 'cd':
+            if entry[1] == '..':
+                if len(stack) > 1:
+                    yield leave()
+            elif entry[1] == '/':
+                while len(stack) > 1:
+                    yield leave()
+            else:
+                parent_path = stack[-1][0]
+                separator = '' if parent_path == '/' else '/'
+                stack.append([parent_path + separator + entry[1], 0])
+        elif entry[0] == 'file':
+            stack[-1][1] += entry[2]
+    while stack:
+        yield leave()
+
+
+def solve_streaming(input_file) -> Tuple[int, int]:
+    """
+    Solves both parts in bounded memory by streaming the transcript twice.
+    The first pass finds the used space, which part 2 needs up front.
+    """
+    with open_input(input_file) as f:
+        used_space = sum(entry[2] for entry in read_transcript(text_lines(f)) if entry[0] == 'file')
+        space_to_clear = used_space - 70000000 + 30000000
+        small_total = 0
+        smallest_eligible = None
+        for directory in stream_directory_sizes(text_lines(f)):
+            # Root is excluded from both parts
+            if directory.path == '/':
+                continue
+            if directory.size < 100000:
+                small_total += directory.size
+            if directory.size > space_to_clear and (smallest_eligible is None or directory.size < smallest_eligible):
+                smallest_eligible = directory.size
+    return small_total, smallest_eligible
+
+
+def parse(input_file) -> FileSystem:
     fs = FileSystem()
-    lines = f.readlines()
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        # Check if line is a command
-        if line.startswith('$'):
-            # Extract the command
-            command = line[1:].strip().split()
-            if command[0] == 'cd':
-                directory_name = command[1]
-                if directory_name == '..':
-                    fs.current_directory = fs.current_directory.parent
-                elif directory_name == '/':
-                    fs.current_directory = fs.root
-                else:
-                    for subdirectory in fs.current_directory.subdirectories:
-                        if subdirectory.name == directory_name:
-                            fs.current_directory = subdirectory
-                            break
-            elif command[0] == 'ls':
-                # Parse subdirectories and files
-                while True:
-                    i = i + 1
-                    if i >= len(lines):
-                        break
-                    child = lines[i]
-                    if child.startswith('$'):
-                        i = i - 1
-                        break
-                    if child.startswith('dir'):
-                        subdirectory_name = child[4:].strip()
-                        subdirectory = Directory(subdirectory_name, fs.current_directory)
-                        fs.current_directory.subdirectories.append(subdirectory)
-                    else:
-                        child_file_details = child.split()
-                        child_file = File(child_file_details[1], int(child_file_details[0]), fs.current_directory)
-                        fs.current_directory.files.append(child_file)
-        i = i + 1
+    with open_input(input_file) as f:
+        for entry in read_transcript(text_lines(f)):
+            if entry[0] == 'cd':
+                fs.change_directory(entry[1])
+            elif entry[0] == 'dir':
+                fs.add_directory(entry[1])
+            else:
+                fs.add_file(entry[1], entry[2])
+    return fs
 
 
-# Get all directories with their size
-def get_all_subdirectories(directory):
-    subdirectories = []
-    for subdirectory in directory.subdirectories:
-        subdirectories.append(subdirectory)
-        subdirectories.extend(get_all_subdirectories(subdirectory))
-    return subdirectories
+def part_1(fs: FileSystem) -> int:
+    # Get all directories with size < 100000
+    small_directories = fs.size_index.at_most(100000 - 1)
+    # Get sum of small_directories
+    return sum([directory.get_size() for directory in small_directories])
+
+
+def part_2(fs: FileSystem) -> int:
+    used_space = fs.used_space
+    total_space = 70000000
+    free_space_required = 30000000
+    space_to_clear = used_space - total_space + free_space_required
+    # Find smallest directory > space_to_clear
+    smallest_eligible_directory = fs.size_index.smallest_at_least(space_to_clear + 1)
+    if smallest_eligible_directory is None:
+        raise ValueError(f"No directory is large enough to free {space_to_clear}")
+    return smallest_eligible_directory.get_size()
+
 
-all_subdirectories = get_all_subdirectories(fs.root)
-# Get all directories with size < 100000
-small_directories = [directory for directory in all_subdirectories if directory.get_size() < 100000]
-# Get sum of small_directories
-print(sum([directory.get_size() for directory in small_directories]))
-
-# Part 2
-used_space = fs.root.get_size()
-total_space = 70000000
-free_space_required = 30000000
-space_to_clear = used_space - total_space + free_space_required
-# Find directories > free_space_required
-eligible_deletion_directories = [directory for directory in all_subdirectories if directory.get_size() > space_to_clear]
-# Find smallest eligible directory
-smallest_eligible_directory = min(eligible_deletion_directories, key=lambda directory: directory.get_size())
-print(f"Size of directory to delete: {smallest_eligible_directory.get_size()}")
\ No newline at end of file
+if __name__ == '__main__':
+    fs = parse(input_file)
+    print(part_1(fs))
+    # Part 2
+    print(f"Size of directory to delete: {part_2(fs)}")
@@ -1,5 +1,18 @@
+import argparse
 import os
+import sys
 from functools import reduce
+from typing import List, Tuple
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
+
+# NumPy is optional, NumpyGrid is only used when it is installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class Grid:
     def __init__(self, width, height):
@@ -23,6 +36,98 @@ class Grid:
                 print(self.grid[x][y], end='')
             print()
 
+    def row(self, y) -> List[int]:
+        return [column[y] for column in self.grid]
+
+    def column(self, x) -> List[int]:
+        return list(self.grid[x])
+
+
+class NumpyGrid:
+    """
+    Grid backed by a uint8 ndarray, indexed [x, y] like Grid.
+    Uses one byte per tree, and computes visibility with vectorised
+    operations rather than per-tree lookups.
+    """
+    def __init__(self, heights):
+        # Heights are stored by row, so transpose to index by x then y
+        self.grid = heights.T
+        self.width, self.height = self.grid.shape
+
+    @staticmethod
+    def from_file(input_file) -> 'NumpyGrid':
+        with open_input(input_file) as f:
+            # The digits are viewed in place, so the subtraction is the only copy
+            return NumpyGrid(f.grid().as_array() - np.uint8(ord('0')))
+
+    def __getitem__(self, item):
+        return int(self.grid[item[0], item[1]])
+
+    def __setitem__(self, key, value):
+        self.grid[key[0], key[1]] = value
+
+    def pretty_print(self):
+        for y in range(self.height):
+            print(''.join(str(value) for value in self.row(y)))
+
+    def row(self, y) -> List[int]:
+        return self.grid[:, y].tolist()
+
+    def column(self, x) -> List[int]:
+        return self.grid[x].tolist()
+
+    def visibility_mask(self):
+        """
+        Boolean array indexed [x, y], True where a tree is visible from
+        outside the grid. A tree is visible from a direction if it is
+        taller than the running maximum of the trees before it.
+        """
+        visible = np.zeros(self.grid.shape, dtype=bool)
+        for axis in (0, 1):
+            for heights in (self.grid, np.flip(self.grid, axis)):
+                tallest = np.maximum.accumulate(heights, axis=axis)
+                # First tree in the line is on the edge so always visible
+                seen = np.ones(heights.shape, dtype=bool)
+                if axis == 0:
+                    seen[1:, :] = heights[1:, :] > tallest[:-1, :]
+                else:
+                    seen[:, 1:] = heights[:, 1:] > tallest[:, :-1]
+                if heights is not self.grid:
+                    seen = np.flip(seen, axis)
+                visible |= seen
+        return visible
+
+    def scenic_scores(self):
+        """
+        int64 array indexed [x, y] of each tree's scenic score. Each direction
+        is swept one row or column at a time, keeping for every height the
+        last position of a tree at least that tall, so a tree's viewing
+        distance is a lookup rather than a walk.
+        """
+        scores = np.ones(self.grid.shape, dtype=np.int64)
+        levels = np.arange(int(self.grid.max()) + 1)[:, None]
+        for axis in (0, 1):
+            length = self.grid.shape[axis]
+            lines = np.arange(self.grid.shape[1 - axis])
+            for order in (range(length), range(length - 1, -1, -1)):
+                # Until a tall enough tree is seen, the view reaches the edge
+                last_blocking = np.full((len(levels), len(lines)), order[0], dtype=np.intp)
+                for i in order:
+                    heights = (self.grid[i] if axis == 0 else self.grid[:, i]).astype(np.intp)
+                    distance = np.abs(i - last_blocking[heights, lines])
+                    if axis == 0:
+                        scores[i] *= distance
+                    else:
+                        scores[:, i] *= distance
+                    np.copyto(last_blocking, i, where=levels <= heights)
+        return scores
+
+    def best_scenic_spot(self) -> Tuple[int, int, int]:
+        """(x, y, score) of the tree with the highest scenic score"""
+        scores = self.scenic_scores()
+        x, y = np.unravel_index(np.argmax(scores), scores.shape)
+        return int(x), int(y), int(scores[x, y])
+
 
 class GridSolver:
     def __init__(self, grid):
@@ -109,31 +214,132 @@ class GridSolver:
         max_score = max(scenic_scores, key=lambda x: x[2])
         return max_score
 
-    
+
+class SweepGridSolver(GridSolver):
+    """
+    Solves both parts in O(width * height) without recursion.
+
+    Each row and column is swept once in each direction, tracking the
+    running maximum height (for visibility) and a monotonic stack of
+    trees that could still block the view (for viewing distance).
+    Results are the same as GridSolver, in the same order.
+    """
+
+    @staticmethod
+    def sweep(heights: List[int]) -> Tuple[List[bool], List[int]]:
+        """
+        Looking back along heights from each tree, returns whether the tree
+        is visible from the start and how many trees can be seen before
+        reaching a tree at least as tall (or the start).
+        """
+        visible = []
+        distances = []
+        # Indices of trees in decreasing height order
+        stack = []
+        tallest = -1
+        for i, height in enumerate(heights):
+            visible.append(height > tallest)
+            tallest = max(tallest, height)
+            # Shorter trees can't block the view from anything behind this tree
+            while stack and heights[stack[-1]] < height:
+                stack.pop()
+            distances.append(i - stack[-1] if stack else i)
+            stack.append(i)
+        return visible, distances
+
+    def sweep_grid(self) -> Tuple[List[List[bool]], List[List[int]]]:
+        """
+        Sweep every row and column in both directions.
+        Returns visibility and scenic score for each tree, indexed [x][y]
+        """
+        width = self.grid.width
+        height = self.grid.height
+        visible = [[False] * height for _ in range(width)]
+        scores = [[1] * height for _ in range(width)]
+
+        def combine(cells, heights):
+            for line_heights, line_cells in ((heights, cells), (heights[::-1], cells[::-1])):
+                line_visible, line_distances = self.sweep(line_heights)
+                for (x, y), is_visible, distance in zip(line_cells, line_visible, line_distances):
+                    visible[x][y] = visible[x][y] or is_visible
+                    scores[x][y] *= distance
+
+        for y in range(height):
+            combine([(x, y) for x in range(width)], self.grid.row(y))
+        for x in range(width):
+            combine([(x, y) for y in range(height)], self.grid.column(x))
+        return visible, scores
+
+    def solve(self):
+        visible, _ = self.sweep_grid()
+        # Edge trees are always visible, and are listed first as in GridSolver
+        visible_trees = []
+        for x in range(self.grid.width):
+            visible_trees.append((x, 0))
+            visible_trees.append((x, self.grid.height - 1))
+        for y in range(1, self.grid.height - 1):
+            visible_trees.append((0, y))
+            visible_trees.append((self.grid.width - 1, y))
+        invisible_trees = []
+        for x, y in self.get_candidates():
+            if visible[x][y]:
+                visible_trees.append((x, y))
+            else:
+                invisible_trees.append((x, y))
+        return {'visible': visible_trees, 'invisible': invisible_trees}
+
+    def solve_part_2(self):
+        _, scores = self.sweep_grid()
+        return max(((x, y, scores[x][y]) for x, y in self.get_candidates()), key=lambda x: x[2])
+
+
 
 input_file = os.path.join(os.path.dirname(__file__), 'input.txt')
 
-with open(input_file, 'r') as f:
-    lines = f.readlines()
-    # Get dimensions of grid
-    width = len(lines[0].strip())
-    height = len(lines)
-    grid = Grid(width, height)
-    for y, line in enumerate(lines):
-        
-        for x, value in enumerate(line):
-            if value == '\n':
-                continue
-            grid[x, y] = int(value)
-
-grid.pretty_print()
-
-solver = GridSolver(grid)
-tree_visibility = solver.solve()
-# Print number of visible and invisible trees
-print(f"Visible trees: {len(tree_visibility['visible'])}")
-print(f"Invisible trees: {len(tree_visibility['invisible'])}")
-print()
-print("Part 2:")
-max_score = solver.solve_part_2()
-print(f"Max score: {max_score[2]} at ({max_score[0]}, {max_score[1]})")
\ No newline at end of file
+
+def parse(input_file) -> Grid:
+    if np is not None:
+        return NumpyGrid.from_file(input_file)
+    with open_input(input_file) as f:
+        rows = f.grid()
+        grid = Grid(rows.width, rows.height)
+        for y, row in enumerate(rows.rows()):
+            for x, value in enumerate(row):
+                grid[x, y] = value - ord('0')
+    return grid
+
+
+def part_1(grid: Grid) -> int:
+    if isinstance(grid, NumpyGrid):
+        return int(grid.visibility_mask().sum())
+    return len(SweepGridSolver(grid).solve()['visible'])
+
+
+def best_scenic_spot(grid: Grid) -> Tuple[int, int, int]:
+    """(x, y, score) of the tree with the highest scenic score"""
+    if isinstance(grid, NumpyGrid):
+        return grid.best_scenic_spot()
+    return SweepGridSolver(grid).solve_part_2()
+
+
+def part_2(grid: Grid) -> int:
+    return best_scenic_spot(grid)[2]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--print', action='store_true', help='Print the grid of tree heights')
+    args = parser.parse_args()
+
+    grid = parse(input_file)
+    if args.print:
+        grid.pretty_print()
+
+    visible_trees = part_1(grid)
+    # Print number of visible and invisible trees
+    print(f"Visible trees: {visible_trees}")
+    print(f"Invisible trees: {grid.width * grid.height - visible_trees}")
+    print()
+    print("Part 2:")
+    x, y, score = best_scenic_spot(grid)
+    print(f"Max score: {score} at ({x}, {y})")
@@ -1,5 +1,12 @@
+import os
 import re
+import sys
 from itertools import chain
+from typing import List, Union
+
+# Shared input helpers live at the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from aoc_input import open_input
 
 class PartNumber:
     def __init__(self, start_x: int, start_y: int, length: int):
@@ -28,8 +35,9 @@ class PartNumber:
         return f"PartNumber(x: {self.start_x}, y: {self.start_y}, len: {self.length})"
 
 class EngineSchematic:
-    def __init__(self, schematic: str):
-        self.schematic = schematic.splitlines()
+    def __init__(self, schematic: Union[str, List[str]]):
+        # Either the whole schematic, or its rows already split
+        self.schematic = schematic.splitlines() if isinstance(schematic, str) else list(schematic)
         self.height = len(self.schematic)
         self.width = len(self.schematic[0])
 
@@ -127,14 +135,21 @@ class EngineSchematic:
 
 
 
+def parse(input_path: str) -> EngineSchematic:
+    with open_input(input_path) as f:
+        return EngineSchematic([str(row, "ascii") for row in f.grid().rows()])
+
+
+def part_1(schematic: EngineSchematic) -> int:
+    parts = schematic.get_valid_part_numbers()
+    return sum(part.get_number(schematic) for part in parts)
+
+
+def part_2(schematic: EngineSchematic) -> int:
+    return schematic.solve_part_2()
 
 
 if __name__ == "__main__":
-    with open("input.txt", "r") as f:
-        schematic = EngineSchematic(f.read())
-        parts = list(schematic.get_valid_part_numbers())
-        part_1_answer = sum(part.get_number(schematic) for part in parts)
-        print(f"Part 1 answer: {part_1_answer}")
-
-        print(f"Part 2 answer: {schematic.solve_part_2()}")
-    
\ No newline at end of file
+    schematic = parse("input.txt")
+    print(f"Part 1 answer: {part_1(schematic)}")
+    print(f"Part 2 answer: {part_2(schematic)}")
@@ -0,0 +1,181 @@
+"""
+Memory-mapped puzzle input shared by the Python solutions.
+
+The input file is mapped rather than read, so large inputs aren't copied
+into Python strings up front. Lines, blank-line separated records and grid
+rows are handed out as memoryview slices of the mapping, which cost nothing
+to create. Convert them only where a value is needed, e.g. int(bytes(line))
+or str(line, 'ascii').
+
+Usage:
+    with open_input(input_path) as f:
+        for line in f.lines():
+            ...
+"""
+import mmap
+import re
+from typing import Iterator, List, Optional, Pattern, Tuple
+
+# NumPy is optional, it is only needed for GridView.as_array
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Line ending, and a blank line between records, with or without a '\r'
+_LINE_END = re.compile(rb'\n')
+_BLANK_LINE = re.compile(rb'\n\r?\n')
+
+
+class GridView:
+    """
+    Fixed-width rows of a grid input, indexed [x, y] as byte values.
+    Rows are read straight from the mapping, skipping the newlines.
+    """
+    def __init__(self, data: memoryview, width: int, height: int, stride: Optional[int] = None):
+        self.data = data
+        self.width = width
+        self.height = height
+        # Each row is followed by a line ending, '\n' unless told otherwise
+        self.stride = width + 1 if stride is None else stride
+
+    def __getitem__(self, item) -> int:
+        x, y = item
+        if not 0 <= x < self.width or not 0 <= y < self.height:
+            raise IndexError(f"Cell {item} is out of bounds")
+        return self.data[y * self.stride + x]
+
+    def row(self, y: int) -> memoryview:
+        start = y * self.stride
+        return self.data[start:start + self.width]
+
+    def rows(self) -> Iterator[memoryview]:
+        for y in range(self.height):
+            yield self.row(y)
+
+    def as_array(self):
+        """(height, width) uint8 array viewing the mapping, without copying"""
+        if np is None:
+            raise ImportError("NumPy is required for grid arrays")
+        data = np.frombuffer(self.data, dtype=np.uint8)
+        return np.lib.stride_tricks.as_strided(data, shape=(self.height, self.width), strides=(self.stride, 1))
+
+
+class InputFile:
+    """
+    A memory-mapped input file. Use as a context manager; views handed out
+    must not be used after it is closed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap: Optional[mmap.mmap] = None
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self._mmap)
+        except ValueError:
+            # Empty files can't be mapped
+            self.view = memoryview(b'')
+
+    def __enter__(self) -> 'InputFile':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        try:
+            self.view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # Something still holds a view, such as a NumPy array,
+            # so the mapping is closed once that is garbage collected
+            pass
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[memoryview]:
+        """Each line without its line ending, optionally only in a byte range"""
+        view = self.view
+        data = self._mmap if self._mmap is not None else b''
+        if end is None:
+            end = len(view)
+        while start < end:
+            newline = data.find(b'\n', start, end)
+            if newline == -1:
+                newline = end
+            line_end = newline
+            if line_end > start and view[line_end - 1] == ord('\r'):
+                line_end -= 1
+            yield view[start:line_end]
+            start = newline + 1
+
+    def records(self, start: int = 0, end: Optional[int] = None) -> Iterator[List[memoryview]]:
+        """Runs of non-blank lines, such as the groups separated by blank lines"""
+        record = []
+        for line in self.lines(start, end):
+            if len(line):
+                record.append(line)
+            elif record:
+                yield record
+                record = []
+        if record:
+            yield record
+
+    def record_chunks(self, chunk_size: int) -> List[Tuple[int, int]]:
+        """
+        Splits the file into byte ranges of about chunk_size, each starting
+        just after a blank line so no record is split between ranges.
+        Only the bytes around each split point are read.
+        """
+        return self._chunks(chunk_size, _BLANK_LINE)
+
+    def line_chunks(self, chunk_size: int) -> List[Tuple[int, int]]:
+        """Like record_chunks, but ranges only need to start on a new line"""
+        return self._chunks(chunk_size, _LINE_END)
+
+    def _chunks(self, chunk_size: int, separator: Pattern[bytes]) -> List[Tuple[int, int]]:
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive: {chunk_size}")
+        data = self._mmap if self._mmap is not None else b''
+        starts = [0]
+        offset = chunk_size
+        while offset < len(data):
+            # Search from a little early, in case the offset splits the
+            # separator, but never before the current range starts
+            found = separator.search(data, max(offset - 2, starts[-1]))
+            if found is None or found.end() >= len(data):
+                break
+            starts.append(found.end())
+            offset = found.end() + chunk_size
+        return list(zip(starts, starts[1:] + [len(data)]))
+
+    def grid(self) -> GridView:
+        """
+        The file as a grid of fixed-width rows, ending in '\n' or '\r\n'.
+        Raises ValueError if the rows aren't all the same width.
+        """
+        data = self._mmap if self._mmap is not None else b''
+        width = data.find(b'\n')
+        if width == -1:
+            width = len(data)
+        # Rows end with '\n' or '\r\n', the same in every row
+        ending = b'\r\n' if width > 0 and data[width - 1:width] == b'\r' else b'\n'
+        width -= len(ending) - 1
+        # The last row doesn't need a trailing line ending
+        size = len(data) - len(ending) if data[-len(ending):] == ending else len(data)
+        stride = width + len(ending)
+        height, remainder = divmod(size + len(ending), stride)
+        if width == 0 or remainder:
+            raise ValueError(f"{self.path} is not a grid of rows of width {width}")
+        for row_end in range(width, size, stride):
+            if data[row_end:row_end + len(ending)] != ending:
+                raise ValueError(f"Row {row_end // stride} of {self.path} is not {width} wide")
+        return GridView(self.view, width, height, stride)
+
+
+def open_input(path: str) -> InputFile:
+    return InputFile(path)
@@ -0,0 +1,210 @@
+"""
+Scaling benchmarks for the Python solutions.
+
+Each benchmarked day has a seeded generator that writes a synthetic puzzle
+input whose size grows linearly with a scale factor. The solver is timed at
+several scales and a power law (time ~ scale ** exponent) is fitted to the
+results. The run fails if any fitted exponent exceeds the budget for that day,
+which catches changes that make a solver asymptotically slower.
+
+Usage:
+    python benchmark.py                       # all benchmarked days
+    python benchmark.py 2022/day_8 2023/day_3 # selected days
+    python benchmark.py --scales 10 100 1000 --repeat 1
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+from typing import Callable, Dict, List, NamedTuple, Optional, TextIO
+
+from runner import ROOT, load_solution, measure
+
+
+class Benchmark(NamedTuple):
+    # Writes an input of the given scale to the file
+    generator: Callable[[TextIO, int, random.Random], None]
+    # Default scales to time the solver at
+    scales: List[int]
+    # Largest fitted exponent that is accepted
+    max_exponent: float
+
+
+def random_packet(rng: random.Random, depth: int = 0) -> str:
+    items = []
+    for _ in range(rng.randint(0, 5)):
+        if depth < 4 and rng.random() < 0.3:
+            items.append(random_packet(rng, depth + 1))
+        else:
+            items.append(str(rng.randint(0, 10)))
+    return '[' + ','.join(items) + ']'
+
+
+def generate_packets(f: TextIO, scale: int, rng: random.Random):
+    """2022 day 13: 10 packet pairs per unit of scale"""
+    pairs = [f"{random_packet(rng)}\n{random_packet(rng)}\n" for _ in range(10 * scale)]
+    f.write('\n'.join(pairs))
+
+
+def generate_rock_paths(f: TextIO, scale: int, rng: random.Random):
+    """
+    2022 day 14: one rock path per unit of scale, spread over a cave
+    whose area grows linearly with scale. A shelf below the pour position
+    keeps it inside the cave.
+    """
+    side = max(10, int(10 * math.sqrt(scale)))
+    f.write(f"{500 - side // 2},{side + 2} -> {500 + side // 2},{side + 2}\n")
+    for _ in range(scale):
+        x = rng.randint(500 - side, 500 + side)
+        y = rng.randint(2, side)
+        points = [(x, y)]
+        for _ in range(rng.randint(1, 3)):
+            length = rng.randint(1, 5)
+            if len(points) % 2:
+                x = x + rng.choice((-length, length))
+            else:
+                y = max(1, y + rng.choice((-length, length)))
+            points.append((x, y))
+        f.write(' -> '.join(f"{x},{y}" for x, y in points) + '\n')
+
+
+def generate_transcript(f: TextIO, scale: int, rng: random.Random):
+    """
+    2022 day 7: a terminal transcript of 10 directories per unit of scale,
+    each with a few files, explored depth first. File sizes shrink as the
+    scale grows so the disk stays around 50000000 used like the puzzle.
+    """
+    n_directories = 10 * scale
+    max_file_size = max(2, 40000000 // n_directories)
+    children = [[] for _ in range(n_directories)]
+    for directory in range(1, n_directories):
+        # Bias towards recent directories to get deeper trees
+        parent = rng.randint(max(0, directory - 20), directory - 1)
+        children[parent].append(directory)
+    f.write('$ cd /\n')
+    stack = [(0, False)]
+    while stack:
+        directory, listed = stack.pop()
+        if listed:
+            if directory != 0:
+                f.write('$ cd ..\n')
+            continue
+        if directory != 0:
+            f.write(f"$ cd d{directory}\n")
+        f.write('$ ls\n')
+        for child in children[directory]:
+            f.write(f"dir d{child}\n")
+        for i in range(rng.randint(1, 4)):
+            f.write(f"{rng.randint(1, max_file_size)} f{i}.txt\n")
+        stack.append((directory, True))
+        for child in reversed(children[directory]):
+            stack.append((child, False))
+
+
+def generate_tree_grid(f: TextIO, scale: int, rng: random.Random):
+    """2022 day 8: a square grid of 100 trees per unit of scale"""
+    side = int(10 * math.sqrt(scale))
+    for _ in range(side):
+        f.write(''.join(str(rng.randint(0, 9)) for _ in range(side)) + '\n')
+
+
+def generate_schematic(f: TextIO, scale: int, rng: random.Random):
+    """
+    2023 day 3: a 10 row schematic that is 10 columns wider per unit of scale.
+    Always starts with a gear, as part 2 requires at least one.
+    """
+    width = 10 * scale
+    for y in range(10):
+        row = list('12*34.') if y == 0 else []
+        while len(row) < width:
+            roll = rng.random()
+            if roll < 0.1:
+                row.extend(str(rng.randint(1, 999)))
+            elif roll < 0.13:
+                row.append(rng.choice('*#+$/'))
+            else:
+                row.append('.')
+            row.append('.')
+        f.write(''.join(row[:width]) + '\n')
+
+
+# Exponent budgets sit just above each solver's current scaling.
+# Tighten them when a solver gets asymptotically faster.
+BENCHMARKS: Dict[str, Benchmark] = {
+    '2022/day_7': Benchmark(generate_transcript, [10, 30, 100, 300, 1000], max_exponent=1.3),
+    '2022/day_8': Benchmark(generate_tree_grid, [10, 30, 100, 300, 1000], max_exponent=1.3),
+    '2022/day_13': Benchmark(generate_packets, [10, 30, 100, 300, 1000], max_exponent=1.3),
+    '2022/day_14': Benchmark(generate_rock_paths, [10, 30, 100, 300, 1000], max_exponent=1.3),
+    '2023/day_3': Benchmark(generate_schematic, [10, 30, 100, 300, 1000], max_exponent=1.3),
+}
+
+
+def fit_exponent(scales: List[int], times: List[float]) -> float:
+    """Least squares slope of log(time) against log(scale)"""
+    xs = [math.log(scale) for scale in scales]
+    ys = [math.log(max(time, 1e-9)) for time in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def solve(module, input_path: str):
+    parsed = module.parse(input_path)
+    return module.part_1(parsed), module.part_2(parsed)
+
+
+def time_solver(module, input_path: str, repeat: int) -> float:
+    """Fastest wall time of repeated parse, part_1 and part_2 runs"""
+    return min(measure(solve, module, input_path, trace_memory=False).wall_time for _ in range(repeat))
+
+
+def run_benchmark(name: str, benchmark: Benchmark, scales: List[int], repeat: int, seed: int) -> float:
+    module = load_solution(os.path.join(ROOT, name, 'solution.py'))
+    if module is None:
+        raise ValueError(f"{name} does not expose parse/part_1/part_2")
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            input_path = os.path.join(directory, f"input_{scale}.txt")
+            with open(input_path, 'w') as f:
+                benchmark.generator(f, scale, random.Random(seed))
+            times.append(time_solver(module, input_path, repeat))
+            print(f"{name:<12} scale {scale:>6} {os.path.getsize(input_path):>12} bytes {times[-1] * 1000:>10.2f} ms")
+    return fit_exponent(scales, times)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark how the solutions scale with input size')
+    parser.add_argument('days', nargs='*', help='Days to benchmark, e.g. 2022/day_8 (default: all)')
+    parser.add_argument('--scales', nargs='+', type=int, help='Override the default scales of each benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scale, the fastest is kept')
+    parser.add_argument('--seed', type=int, default=2022)
+    args = parser.parse_args(argv)
+
+    if args.scales is not None and len(args.scales) < 2:
+        parser.error('At least two scales are needed to fit an exponent')
+    names = args.days or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"No benchmark for {', '.join(unknown)}")
+
+    failures = []
+    for name in names:
+        benchmark = BENCHMARKS[name]
+        exponent = run_benchmark(name, benchmark, args.scales or benchmark.scales, args.repeat, args.seed)
+        status = 'ok' if exponent <= benchmark.max_exponent else 'FAIL'
+        print(f"{name:<12} exponent {exponent:.2f} (max {benchmark.max_exponent:.2f}) {status}")
+        if status == 'FAIL':
+            failures.append(name)
+    if failures:
+        print(f"Scaling regressions: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Shared runner for the Python solutions.
+
+Finds each YEAR/day_N/solution.py that exposes the `parse`, `part_1` and
+`part_2` entry points, then runs and times each phase separately.
+
+Usage:
+    python runner.py                  # every year and day
+    python runner.py 2022             # every day in 2022
+    python runner.py 2022 7 8         # days 7 and 8 of 2022
+    python runner.py 2022 --input-root /path/to/inputs
+"""
+import argparse
+import importlib
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINTS = ('parse', 'part_1', 'part_2')
+DAY_PATTERN = re.compile(r'^day_(\d+)$')
+
+
+class Measurement(NamedTuple):
+    result: Any
+    wall_time: float
+    cpu_time: float
+    peak_memory: Optional[int]
+
+
+def find_solutions(years: Optional[List[str]] = None, days: Optional[List[int]] = None) -> List[Tuple[str, int, str]]:
+    """
+    Find all (year, day, path) combinations of Python solutions,
+    sorted by year then day.
+    """
+    solutions = []
+    for year in sorted(os.listdir(ROOT)):
+        if not year.isdigit() or (years and year not in years):
+            continue
+        year_path = os.path.join(ROOT, year)
+        for day_directory in os.listdir(year_path):
+            match = DAY_PATTERN.match(day_directory)
+            if match is None:
+                continue
+            day = int(match.group(1))
+            if days and day not in days:
+                continue
+            path = os.path.join(year_path, day_directory, 'solution.py')
+            if os.path.exists(path):
+                solutions.append((year, day, path))
+    return sorted(solutions, key=lambda solution: (solution[0], solution[1]))
+
+
+def load_solution(path: str):
+    """
+    Import a solution module from its path.
+    Returns None if the module does not expose the runner entry points.
+    """
+    # Imported by its real name, such as 2022.day_7.solution, with the years
+    # and days as namespace packages. Process pool workers can then import
+    # the module to unpickle their tasks, whether they are forked or spawned
+    if ROOT not in sys.path:
+        sys.path.append(ROOT)
+    name = os.path.splitext(os.path.relpath(path, ROOT))[0].replace(os.sep, '.')
+    module = importlib.import_module(name)
+    if not all(callable(getattr(module, entry_point, None)) for entry_point in ENTRY_POINTS):
+        return None
+    return module
+
+
+def measure(function: Callable, *args, trace_memory: bool = True) -> Measurement:
+    """
+    Call function with args, recording wall time, CPU time and peak memory.
+
+    Memory tracing slows down allocation heavy code, so the timings are
+    taken from an untraced call and the peak memory from a second traced call.
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = function(*args)
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+    peak_memory = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            function(*args)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return Measurement(result, wall_time, cpu_time, peak_memory)
+
+
+def format_memory(n_bytes: Optional[int]) -> str:
+    if n_bytes is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if n_bytes < 1024:
+            return f"{n_bytes:.1f} {unit}" if unit != 'B' else f"{n_bytes} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} GiB"
+
+
+def run_solution(module, input_path: str, trace_memory: bool = True) -> List[Tuple[str, Measurement]]:
+    """Run the parse, part_1 and part_2 phases of a solution module"""
+    parsed = measure(module.parse, input_path, trace_memory=trace_memory)
+    measurements = [('parse', parsed)]
+    for part in ('part_1', 'part_2'):
+        measurements.append((part, measure(getattr(module, part), parsed.result, trace_memory=trace_memory)))
+    return measurements
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run and time Advent of Code solutions')
+    parser.add_argument('year', nargs='?', help='Only run solutions for this year')
+    parser.add_argument('days', nargs='*', type=int, help='Only run these days')
+    parser.add_argument('--input-root', default=ROOT, help='Directory containing YEAR/day_N/input.txt files')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced run used to measure peak memory')
+    args = parser.parse_args(argv)
+
+    solutions = find_solutions([args.year] if args.year else None, args.days)
+    if not solutions:
+        print('No solutions found')
+        return 1
+    print(f"{'solution':<14} {'phase':<7} {'wall':>10} {'cpu':>10} {'peak':>12}  answer")
+    for year, day, path in solutions:
+        label = f"{year}/day_{day}"
+        input_path = os.path.join(args.input_root, year, f"day_{day}", 'input.txt')
+        if not os.path.exists(input_path):
+            print(f"{label:<14} skipped: no input at {input_path}")
+            continue
+        module = load_solution(path)
+        if module is None:
+            print(f"{label:<14} skipped: no parse/part_1/part_2 entry points")
+            continue
+        for phase, measurement in run_solution(module, input_path, trace_memory=not args.no_memory):
+            answer = '' if phase == 'parse' else measurement.result
+            print(f"{label:<14} {phase:<7} {measurement.wall_time * 1000:>7.2f} ms {measurement.cpu_time * 1000:>7.2f} ms "
+                  f"{format_memory(measurement.peak_memory):>12}  {answer}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())